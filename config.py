@@ -4,11 +4,80 @@ import numpy as np
 X_Center = 321
 Y_Center = 255
 
+# 像素→手臂座標標定檔（由 tools/calibrate.py 產生，不存在時使用上面的分段線性換算）
+CALIBRATION_FILE = "calibration.json"
+
 # 影像編號
 Video_num = 1  # 修改為 0，測試是否正確
+CAMERA_RING_SIZE = 3      # 背景擷取保留的最新影像張數
+CAMERA_MAX_FAILURES = 30  # 連續讀取失敗幾次視為攝影機失效
+
+# 攝影機擷取設定（可用 python -m tools.probe_camera 量測各模式實際效能後調整）
+CAMERA_PROFILE = {
+    'backend': 'auto',   # auto / dshow / msmf / v4l2 / avfoundation / any
+    'fourcc': 'MJPG',    # MJPG 壓縮傳輸，USB 頻寬足以跑高 FPS；None 表示不設定
+    'width': 640,
+    'height': 480,
+    'fps': 30,
+    'buffer_size': 1     # 驅動端緩衝張數，越小延遲越低
+}
+
+# 攝影機列表：第一台為主攝影機（夾取流程使用），其餘只做檢測與顯示（例如品檢攝影機）
+# 多台時各攝影機影像合併成一次批次推論；profile 可覆蓋 CAMERA_PROFILE 的部分欄位
+CAMERAS = [
+    {'name': 'infeed', 'source': Video_num, 'mask': "mask.png"},
+    # {'name': 'qa', 'source': 2, 'mask': "mask_qa.png", 'profile': {'fps': 15}},
+]
 # 亮度調整參數 0.1(暗)---0.9(亮)
 Gamma_Value = 0.6
 
+# 曝光正規化：依遮罩區域亮度中位數自動選擇伽馬值，只校正送進模型的 ROI 複本（EXPOSURE_AUTO = False 時固定使用 Gamma_Value）
+# 分割與動態閘門使用未校正的影像；尚未以實際影像驗證模型在校正後的表現，預設關閉
+EXPOSURE_NORMALIZE = False
+EXPOSURE_AUTO = True
+EXPOSURE_TARGET = 0.45           # 亮度中位數的目標（0~1）
+EXPOSURE_GAMMA_RANGE = (0.3, 3.0)
+EXPOSURE_GAMMA_STEP = 0.05       # 伽馬值量化間距（查表依此快取）
+EXPOSURE_HYSTERESIS = 0.1        # 新伽馬值與目前相差超過此值才切換
+EXPOSURE_SCALE = 0.25            # 估計亮度前的縮小比例
+
+# 推論引擎
+DETECTOR_ENGINE = 'ultralytics'  # ultralytics（PyTorch）/ onnx（ONNX Runtime，首次使用時自動匯出並快取）
+DETECTOR_WEIGHTS = "./Cube_Color_4_and_Defect_Model/V12_4_Color_Training12/weights/best.pt"
+DETECTOR_CONF = 0.7             # 信心門檻
+DETECTOR_IOU = 0.7              # NMS IoU 門檻（與 ultralytics 預設相同）
+ONNX_THREADS = 0                # ONNX Runtime 執行緒數，0 表示自動
+ONNX_INT8 = False               # 使用 INT8 量化模型（需先以 tools.quantize_detector 產生並通過精度檢查）
+QUANT_MAX_MAP_DROP = 0.02       # INT8 模型 mAP50 允許低於訓練紀錄（results.csv）的最大差距
+DETECTOR_IMGSZ = 640            # 推論解析度（訓練時為 640，影像縮放比例為 DETECTOR_IMGSZ / 640）
+
+# 調校工具寫入的執行期設定（覆蓋上面的預設值，例如 python -m tools.autotune_imgsz 寫入的 imgsz）
+RUNTIME_CONFIG_FILE = "runtime_config.json"
+AUTOTUNE_SIZES = (320, 416, 512, 640)  # 自動調校候選的推論解析度
+AUTOTUNE_MIN_AGREEMENT = 0.95          # 與 640 結果的最低一致度（F1）
+TRACKER_IOU = 0.3               # ONNX 引擎追蹤配對的 IoU 門檻
+TRACKER_MAX_AGE = 10            # 追蹤編號幾張影像沒配對到就移除
+
+# 未知物件（輪廓沒有對應到檢測框）判定
+SEGMENT_V_THRESHOLD = 99      # 亮度（HSV 的 V = max(B, G, R)）達此值視為非黑色背景
+UNKNOWN_MIN_AREA = 500        # 輪廓面積下限
+UNKNOWN_MARGIN = 20           # 輪廓外框落在檢測框外擴此像素內視為已知
+UNKNOWN_MATCH_IOU = None      # 與檢測框 IoU 達此值也視為已知，None 表示只看包含關係
+UNKNOWN_LOOP_MAX_PAIRS = 1000 # 輪廓 × 檢測框組合數不超過此值時逐一比對，超過才向量化
+
+# 靜止場景跳過推論
+MOTION_GATE = True
+MOTION_SCALE = 0.25           # 差異比對前的縮小比例
+MOTION_PIXEL_THRESHOLD = 25   # 灰階差異超過此值視為變化像素
+MOTION_THRESHOLD = 0.01       # 變化像素佔遮罩面積比例超過此值才推論
+MOTION_MAX_STALE = 1.0        # 最久多少秒一定重新推論
+
+# 關鍵影格模式：檢測器每 N 張執行一次，其餘以光流推移檢測框
+KEYFRAME_MODE = False
+KEYFRAME_MIN_INTERVAL = 1     # N 的下限
+KEYFRAME_MAX_INTERVAL = 8     # N 的上限（靜止或慢速時）
+KEYFRAME_MAX_DRIFT = 40       # 兩次檢測之間允許的最大位移（像素），決定 N
+
 # 不動參數
 n1 = 0
 color_th = 1500
@@ -23,6 +92,20 @@ color_map = {
     'broken': (141, 23, 232)     # 損毀
 }
 
+# 檢測框預設由前端依 detections 資料在 canvas 上繪製，串流影像保持原始畫面
+SERVER_SIDE_OVERLAY = False   # True 時由伺服器把檢測框畫進串流影像（備援）
+LOCAL_PREVIEW = False         # 顯示本機 cv2 預覽視窗（含檢測框，每張影像都要複製與繪製，只在除錯時開啟）
+
+# 類別對應語音檔編號（music/<編號>.mp3）
+sound_map = {
+    'blue': 11,
+    'yellow': 12,
+    'green': 13,
+    'red': 14,
+    'unknown': 15,
+    'broken': 16
+}
+
 # 物件計數初始化
 object_counts_init = {
     'red': 0,
@@ -35,4 +118,66 @@ object_counts_init = {
 
 # Dobot 連接參數
 DOBOT_PORT = "COM3"
-DOBOT_BAUDRATE = 115200
\ No newline at end of file
+DOBOT_BAUDRATE = 115200
+DOBOT_JOB_QUEUE_SIZE = 4  # 手臂工作佇列長度
+DOBOT_JOB_TTL = 5.0       # 檢測結果有效時間（秒），超過就不執行；0 表示不限制（停帶夾取改以輸送帶是否前進過判斷）
+DOBOT_POLL_INTERVAL_MS = 20  # 查詢佇列指令索引的間隔（毫秒）
+DOBOT_STREAMING = False      # 串流模式：裝置佇列持續執行，不在每個工作之間清空
+DOBOT_STREAM_WINDOW = 2      # 串流模式下最多同時排在裝置佇列上的工作數
+DOBOT_HOME = (270, 0, 50)    # 每次放置後回到的待命位置 (x, y, z)
+DOBOT_REACH_MIN = 150        # 可夾取半徑下限（mm）
+DOBOT_REACH_MAX = 315        # 可夾取半徑上限（mm）
+
+# 各顏色放置位置 (x, y)（手臂座標，mm）
+BIN_POSITIONS = {
+    'yellow': (10, -213),
+    'blue': (150, -213),
+    'red': (80, -213),
+    'green': (220, -213)
+}
+
+# 輸送帶參數
+CONVEYOR_SPEED = 12500       # 輸送帶馬達速度
+CONVEYOR_INDEX_MS = 4850     # 停帶夾取時輸送帶前進的時間（毫秒），座標換算以此標定
+
+# 邊走邊夾（輸送帶不停止，預測物件位置攔截夾取）
+PICK_ON_THE_MOVE = False
+CONVEYOR_VELOCITY_WINDOW = 30  # 速度估計使用的樣本數
+CONVEYOR_MIN_SAMPLES = 5       # 至少需要幾個樣本才輸出速度
+CONVEYOR_SAMPLE_MAX_AGE = 2.0  # 速度樣本的有效時間（秒），輸送帶停止或重新啟動後舊樣本不再使用
+CONVEYOR_TRACK_TIMEOUT = 1.0   # 追蹤編號多久沒出現就移除（秒）
+ARM_SPEED_MM_S = 200.0         # 手臂平均移動速度（mm/s）
+ARM_MOVE_OVERHEAD_S = 0.15     # 每次移動的加減速額外時間（秒）
+ARM_DESCEND_TIME_S = 0.5       # 下降到夾取高度所需時間（秒）
+
+# 夾取順序規劃
+PICK_HANDLING_S = 1.2          # 下降、吸取、上升所需時間（秒）
+PLACE_HANDLING_S = 1.0         # 下降、放開、上升所需時間（秒）
+PLANNER_EXACT_MAX = 7          # 工作數量不超過此值時求精確解，否則用貪婪 + 2-opt
+PICK_RETURN_HOME_EACH = False  # 每次放置後都回待命位置（False 則整批做完才回去）
+
+# 追蹤狀態表
+TRACK_STATE_TIMEOUT = 5.0      # 追蹤編號多久沒出現就移除狀態（秒）
+
+# 動作順序控制（等待實際完成訊號，以下為逾時上限，秒）
+AUDIO_LEAD_TIME = 0.0        # 語音開始後延遲多久再動作
+AUDIO_DONE_TIMEOUT = 8.0     # 等待語音播放結束
+PICK_DONE_TIMEOUT = 20.0     # 等待夾取完成（佇列索引到達）
+CONVEYOR_DONE_TIMEOUT = 10.0 # 等待輸送帶停止
+
+# 管線參數
+PIPELINE_QUEUE_SIZE = 1       # 各階段佇列長度（滿了丟棄最舊）
+PIPELINE_STATS_INTERVAL = 5.0 # 管線統計回報間隔（秒）
+
+# 串流自適應：依前端回報的影像確認（frame_ack）調整 JPEG 品質、縮放比例與影格率
+STREAM_ADAPTIVE = True
+STREAM_TARGET_DELAY = 0.3         # 擷取到前端顯示完成的目標延遲（秒）
+STREAM_BANDWIDTH_BUDGET = 8e6     # 串流頻寬上限（bit/s）
+STREAM_QUALITY_RANGE = (40, 90)   # JPEG 品質範圍（STREAM_ADAPTIVE = False 時固定用上限）
+STREAM_QUALITY_STEP = 10
+STREAM_SCALES = (1.0, 0.75, 0.5)  # 可用的縮放比例，由大到小
+STREAM_FPS_RANGE = (5, 30)        # 串流影格率範圍
+STREAM_ADJUST_INTERVAL = 1.0      # 兩次調整之間的最短間隔（秒）
+STREAM_CLIENT_TIMEOUT = 5.0       # 超過此秒數沒有任何確認的前端不列入控制
+STREAM_MAX_INFLIGHT = 1           # 每個訂閱者未確認的影像上限，超過時只保留最新一張、跳過中間的影像
+STREAM_ACK_TIMEOUT = 5.0          # 超過此秒數沒有確認的影像視為遺失
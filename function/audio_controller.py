@@ -1,4 +1,5 @@
 import os
+import time
 from pygame import mixer
 
 class AudioController:
@@ -9,7 +10,8 @@ class AudioController:
         print(f"音效資料夾路徑: {self.music_dir}")
     
     def speak(self, file_name):
-        """播放音效檔案"""
+        """播放音效檔案（不等待播放結束）"""
+        audio_file = None
         try:
             mixer.init()
             audio_file = os.path.join(self.music_dir, str(file_name) + '.mp3')
@@ -18,12 +20,26 @@ class AudioController:
             # 檢查檔案是否存在
             if not os.path.exists(audio_file):
                 print(f"警告: 音效檔案不存在 - {audio_file}")
-                return
+                return False
                 
             mixer.music.load(audio_file)
             mixer.music.play()
             print(f"成功播放音效: {file_name}")
+            return True
             
         except Exception as e:
             print(f"播放音效失敗: {e}")
-            print(f"檔案路徑: {audio_file}")
\ No newline at end of file
+            print(f"檔案路徑: {audio_file}")
+            return False
+    
+    def wait_until_done(self, timeout=None, poll=0.02):
+        """等待音效播放結束，逾時回傳 False"""
+        deadline = time.time() + timeout if timeout else None
+        try:
+            while mixer.get_init() and mixer.music.get_busy():
+                if deadline is not None and time.time() > deadline:
+                    return False
+                time.sleep(poll)
+        except Exception as e:
+            print(f"查詢播放狀態失敗: {e}")
+        return True
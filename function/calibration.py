@@ -0,0 +1,101 @@
+import os
+import json
+import numpy as np
+from config import X_Center, Y_Center
+
+class LegacyCalibration:
+    """原本的分段線性換算（以吸盤中心點 X_Center/Y_Center 為基準）"""
+
+    name = 'legacy'
+
+    def __init__(self, x_center=X_Center, y_center=Y_Center):
+        self.x_center = x_center
+        self.y_center = y_center
+
+    def pixels_to_robot(self, points):
+        """(N, 2) 像素座標轉換為 (N, 2) 手臂座標"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        dx = points[:, 0] - self.x_center
+        dy = points[:, 1] - self.y_center
+        offx = np.where(dx >= 0, -dx * 0.4921233, -dx * 0.5138767)
+        offy = np.where(dy >= 0, dy * 0.5001383, dy * 0.5043755)
+        return np.stack([268.3032 + offx, offy], axis=1)
+
+class HomographyCalibration:
+    """以像素/手臂座標點對擬合的單應性矩陣換算"""
+
+    name = 'homography'
+
+    def __init__(self, matrix, rms=None):
+        self.matrix = np.asarray(matrix, dtype=np.float64).reshape(3, 3)
+        self.rms = rms
+
+    @classmethod
+    def fit(cls, pixels, robots):
+        """以 DLT（含座標正規化）擬合單應性矩陣，至少需要 4 組點對"""
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+        robots = np.asarray(robots, dtype=np.float64).reshape(-1, 2)
+        if len(pixels) < 4 or len(pixels) != len(robots):
+            raise ValueError("擬合單應性矩陣至少需要 4 組對應的點")
+
+        t_pix = _normalize_transform(pixels)
+        t_rob = _normalize_transform(robots)
+        p = _apply(t_pix, pixels)
+        r = _apply(t_rob, robots)
+
+        n = len(p)
+        A = np.zeros((2 * n, 9))
+        A[0::2, 0:2] = p
+        A[0::2, 2] = 1
+        A[0::2, 6:8] = -p * r[:, 0:1]
+        A[0::2, 8] = -r[:, 0]
+        A[1::2, 3:5] = p
+        A[1::2, 5] = 1
+        A[1::2, 6:8] = -p * r[:, 1:2]
+        A[1::2, 8] = -r[:, 1]
+        _, _, vt = np.linalg.svd(A)
+        H = np.linalg.inv(t_rob) @ vt[-1].reshape(3, 3) @ t_pix
+        H /= H[2, 2]
+
+        model = cls(H)
+        model.rms = float(np.sqrt(np.mean(np.sum((model.pixels_to_robot(pixels) - robots) ** 2, axis=1))))
+        return model
+
+    def pixels_to_robot(self, points):
+        """(N, 2) 像素座標轉換為 (N, 2) 手臂座標"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return _apply(self.matrix, points)
+
+    def save(self, path):
+        """儲存為 JSON 檔"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.name, 'matrix': self.matrix.tolist(), 'rms_mm': self.rms}, f, indent=2)
+
+def _normalize_transform(points):
+    """平移到重心並縮放使平均距離為 sqrt(2)，提高 DLT 的數值穩定度"""
+    mean = points.mean(axis=0)
+    dist = np.mean(np.linalg.norm(points - mean, axis=1))
+    scale = np.sqrt(2) / dist if dist > 0 else 1.0
+    return np.array([[scale, 0, -scale * mean[0]],
+                     [0, scale, -scale * mean[1]],
+                     [0, 0, 1]])
+
+def _apply(matrix, points):
+    """對 (N, 2) 點套用 3x3 投影轉換"""
+    mapped = points @ matrix[:, :2].T + matrix[:, 2]
+    return mapped[:, :2] / mapped[:, 2:3]
+
+def load_calibration(path):
+    """載入標定檔，檔案不存在或格式錯誤時退回原本的換算"""
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('model') == HomographyCalibration.name:
+                print(f"載入座標標定檔: {path}（RMS {data.get('rms_mm')} mm）")
+                return HomographyCalibration(data['matrix'], data.get('rms_mm'))
+            print(f"未知的標定模型: {data.get('model')}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"讀取標定檔失敗: {e}")
+    print("使用預設的分段線性座標換算")
+    return LegacyCalibration()
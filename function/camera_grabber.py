@@ -0,0 +1,139 @@
+import time
+import platform
+import threading
+from collections import deque
+import cv2
+from config import CAMERA_RING_SIZE, CAMERA_MAX_FAILURES, CAMERA_PROFILE
+
+# 擷取後端名稱對應 OpenCV 常數
+BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'v4l2': cv2.CAP_V4L2,
+    'avfoundation': cv2.CAP_AVFOUNDATION,
+}
+
+def default_backend():
+    """依作業系統選擇擷取後端，避免 OpenCV 逐一嘗試造成開啟緩慢"""
+    system = platform.system()
+    if system == 'Windows':
+        return 'dshow'
+    if system == 'Linux':
+        return 'v4l2'
+    if system == 'Darwin':
+        return 'avfoundation'
+    return 'any'
+
+def open_capture(source, profile=CAMERA_PROFILE):
+    """依擷取設定開啟攝影機（後端、FOURCC、解析度、FPS、緩衝區大小）"""
+    backend = profile.get('backend') or 'auto'
+    if backend == 'auto':
+        backend = default_backend()
+    start = time.time()
+    capture = cv2.VideoCapture(source, BACKENDS.get(backend, cv2.CAP_ANY))
+    if not capture.isOpened():
+        print(f"攝影機 {source} 以 {backend} 後端開啟失敗")
+        return capture
+
+    # FOURCC 需在解析度之前設定，部分驅動才會切換到對應模式
+    if profile.get('fourcc'):
+        capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profile['fourcc']))
+    if profile.get('width'):
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, profile['width'])
+    if profile.get('height'):
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, profile['height'])
+    if profile.get('fps'):
+        capture.set(cv2.CAP_PROP_FPS, profile['fps'])
+    if profile.get('buffer_size'):
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, profile['buffer_size'])
+
+    print(f"攝影機 {source} 開啟耗時 {time.time() - start:.2f} 秒，實際設定: {describe_capture(capture)}")
+    return capture
+
+def describe_capture(capture):
+    """讀回攝影機實際採用的設定"""
+    code = int(capture.get(cv2.CAP_PROP_FOURCC))
+    fourcc = ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)) if code > 0 else '?'
+    return {
+        'backend': capture.getBackendName() if capture.isOpened() else None,
+        'fourcc': fourcc,
+        'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': capture.get(cv2.CAP_PROP_FPS),
+        'buffer_size': int(capture.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+class FrameGrabber(threading.Thread):
+    """背景持續讀取攝影機，只保留最新的幾張影像，避免 OpenCV 緩衝區堆積舊影像"""
+
+    def __init__(self, capture, ring_size=CAMERA_RING_SIZE):
+        super().__init__(name='camera-grabber', daemon=True)
+        self.capture = capture
+        self.ring = deque(maxlen=ring_size)  # (seq, timestamp, frame)
+        self.cond = threading.Condition()
+        self.running = False
+        self.failed = False
+        self.seq = 0
+        self.dropped = 0
+        self._delivered_seq = 0
+        self._stamps = deque()
+
+    def run(self):
+        self.running = True
+        failures = 0
+        while self.running:
+            ret, frame = self.capture.read()
+            timestamp = time.time()
+            if not ret:
+                failures += 1
+                if failures >= CAMERA_MAX_FAILURES:
+                    print("攝影機連續讀取失敗，停止擷取")
+                    with self.cond:
+                        self.failed = True
+                        self.cond.notify_all()
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+            with self.cond:
+                self.seq += 1
+                self.ring.append((self.seq, timestamp, frame))
+                self._stamps.append(timestamp)
+                while self._stamps and timestamp - self._stamps[0] > 2.0:
+                    self._stamps.popleft()
+                self.cond.notify_all()
+        self.running = False
+
+    def latest(self, timeout=1.0):
+        """取得最新且尚未取過的影像 (seq, timestamp, frame)，逾時或攝影機失效回傳 None
+
+        timeout 為 0 時不等待，沒有新影像直接回傳 None。
+
+        兩次取用之間被覆蓋、沒有被處理到的影像計入 dropped。
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.failed or (self.ring and self.ring[-1][0] > self._delivered_seq), timeout):
+                return None
+            if not self.ring or self.ring[-1][0] <= self._delivered_seq:
+                return None
+            seq, timestamp, frame = self.ring[-1]
+            if self._delivered_seq:
+                self.dropped += seq - self._delivered_seq - 1
+            self._delivered_seq = seq
+            return seq, timestamp, frame
+
+    def stop(self):
+        self.running = False
+        if self.is_alive() and self is not threading.current_thread():
+            self.join(timeout=1.0)
+
+    def stats(self):
+        """擷取幀率、總張數與丟棄張數"""
+        with self.cond:
+            return {
+                'fps': round(len(self._stamps) / 2.0, 2),
+                'frames': self.seq,
+                'dropped': self.dropped,
+                'buffered': len(self.ring),
+            }
@@ -0,0 +1,66 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from config import CONVEYOR_VELOCITY_WINDOW, CONVEYOR_MIN_SAMPLES, CONVEYOR_TRACK_TIMEOUT, CONVEYOR_SAMPLE_MAX_AGE
+
+class ConveyorModel:
+    """由追蹤物件的中心點位移估計輸送帶速度（像素/秒），並預測物件位置"""
+
+    def __init__(self, max_age=CONVEYOR_SAMPLE_MAX_AGE):
+        self.max_age = max_age
+        self._last_seen = {}  # track_id -> (center, timestamp)
+        self._samples = deque(maxlen=CONVEYOR_VELOCITY_WINDOW)  # (速度, timestamp)
+        self._lock = threading.Lock()
+
+    def update(self, objects, timestamp):
+        """以一張影像的檢測結果更新速度估計"""
+        with self._lock:
+            for obj in objects:
+                track_id = obj.get('track_id')
+                if track_id is None:
+                    continue
+                center = np.array(obj['center'], dtype=np.float64)
+                prev = self._last_seen.get(track_id)
+                if prev is not None:
+                    dt = timestamp - prev[1]
+                    if dt > 0:
+                        self._samples.append(((center - prev[0]) / dt, timestamp))
+                self._last_seen[track_id] = (center, timestamp)
+
+            # 清除太久沒出現的追蹤編號
+            for track_id in [k for k, v in self._last_seen.items() if timestamp - v[1] > CONVEYOR_TRACK_TIMEOUT]:
+                del self._last_seen[track_id]
+
+    def velocity(self, now=None):
+        """回傳估計速度 (vx, vy)，有效樣本不足時回傳 None
+
+        超過 max_age 的樣本先移除；場景靜止時（動態閘門沿用結果）不會呼叫 update，
+        所以依目前時間而不是最後一張影像的時間判斷。
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            while self._samples and now - self._samples[0][1] > self.max_age:
+                self._samples.popleft()
+            if len(self._samples) < CONVEYOR_MIN_SAMPLES:
+                return None
+            # 取中位數以排除追蹤跳動造成的離群值
+            vx, vy = np.median(np.array([v for v, _ in self._samples]), axis=0)
+        return float(vx), float(vy)
+
+    def predict(self, center, timestamp, target_time=None):
+        """預測物件在 target_time 時的像素位置"""
+        v = self.velocity()
+        if v is None:
+            return center
+        if target_time is None:
+            target_time = time.time()
+        dt = target_time - timestamp
+        return center[0] + v[0] * dt, center[1] + v[1] * dt
+
+    def reset(self):
+        """清除所有樣本"""
+        with self._lock:
+            self._last_seen.clear()
+            self._samples.clear()
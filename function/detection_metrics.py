@@ -0,0 +1,139 @@
+import itertools
+import numpy as np
+
+def box_iou(a, b):
+    """計算兩組框 (N, 4)、(M, 4) 的 IoU 矩陣 (N, M)，框格式為 (x1, y1, x2, y2)"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+def as_boxes(boxes):
+    """轉為 (N, 4) float64 陣列；(x1, y1, x2, y2) tuple 的列表以 fromiter 轉換，比 np.asarray 快"""
+    if isinstance(boxes, np.ndarray):
+        return boxes.astype(np.float64, copy=False).reshape(-1, 4)
+    boxes = list(boxes)
+    flat = np.fromiter(itertools.chain.from_iterable(boxes), dtype=np.float64, count=4 * len(boxes))
+    return flat.reshape(-1, 4)
+
+def box_containment(inner, outer, margin=0):
+    """(N, M) 布林矩陣：inner[i] 是否完全落在向外擴張 margin 像素的 outer[j] 內"""
+    # 轉為各座標的連續陣列，四次廣播比較以就地 AND 合併
+    ix1, iy1, ix2, iy2 = as_boxes(inner).T[:, :, None]
+    ox1, oy1, ox2, oy2 = as_boxes(outer).T
+    inside = ix1 >= ox1 - margin
+    inside &= iy1 >= oy1 - margin
+    inside &= ix2 <= ox2 + margin
+    inside &= iy2 <= oy2 + margin
+    return inside
+
+def _unknown_loop(blobs, detections, margin, iou_threshold):
+    """逐一比對的版本，少量框時沒有建立陣列的固定成本"""
+    unknown = []
+    for i, (x1, y1, x2, y2) in enumerate(blobs):
+        for bbox in detections:
+            if (x1 >= bbox[0] - margin and x2 <= bbox[2] + margin and
+                    y1 >= bbox[1] - margin and y2 <= bbox[3] + margin):
+                break
+            if iou_threshold is not None and box_iou((x1, y1, x2, y2), bbox)[0, 0] >= iou_threshold:
+                break
+        else:
+            unknown.append(i)
+    return unknown
+
+def unknown_indices(blobs, detections, margin=20, iou_threshold=None, loop_max_pairs=1000):
+    """回傳沒有對應到任何檢測框的 blob 索引列表
+
+    blob 落在外擴 margin 像素的檢測框內即視為已知；iou_threshold 有設定時，
+    與檢測框的 IoU 達門檻也視為已知。blob × 檢測框的組合數不超過 loop_max_pairs 時
+    逐一比對（向量化有約 30 us 的固定成本，少量框時反而較慢），否則一次計算包含矩陣。
+    """
+    if not isinstance(blobs, np.ndarray) and not isinstance(detections, np.ndarray):
+        blobs, detections = list(blobs), list(detections)
+        if len(blobs) * len(detections) <= loop_max_pairs:
+            return _unknown_loop(blobs, detections, margin, iou_threshold)
+    blobs = as_boxes(blobs)
+    detections = as_boxes(detections)
+    if len(detections) == 0:
+        return list(range(len(blobs)))
+    known = box_containment(blobs, detections, margin)
+    if iou_threshold is not None:
+        known |= box_iou(blobs, detections) >= iou_threshold
+    return np.flatnonzero(~known.any(axis=1)).tolist()
+
+def _average_precision(recall, precision):
+    """以所有點插值計算 AP（與 ultralytics/VOC 相同）"""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    idx = np.where(mrec[1:] != mrec[:-1])[0]
+    return float(np.sum((mrec[idx + 1] - mrec[idx]) * mpre[idx + 1]))
+
+def mean_average_precision(predictions, references, iou_threshold=0.5):
+    """計算 mAP（預設 mAP50）
+
+    predictions、references 為每張影像的物件列表，物件含 'class'、'bbox'，
+    predictions 另需 'confidence'。references 可以是人工標註或基準模型的輸出。
+    """
+    classes = sorted({obj['class'] for objs in references for obj in objs})
+    if not classes:
+        return 0.0
+    aps = []
+    for cls in classes:
+        scores, hits = [], []
+        total = 0
+        for preds, refs in zip(predictions, references):
+            ref_boxes = [obj['bbox'] for obj in refs if obj['class'] == cls]
+            pred = sorted((obj for obj in preds if obj['class'] == cls), key=lambda o: -o['confidence'])
+            total += len(ref_boxes)
+            if not pred:
+                continue
+            matched = np.zeros(len(ref_boxes), dtype=bool)
+            ious = box_iou([obj['bbox'] for obj in pred], ref_boxes) if ref_boxes else None
+            for i, obj in enumerate(pred):
+                scores.append(obj['confidence'])
+                hit = False
+                if ious is not None:
+                    candidates = np.where((ious[i] >= iou_threshold) & ~matched)[0]
+                    if len(candidates):
+                        j = candidates[np.argmax(ious[i][candidates])]
+                        matched[j] = True
+                        hit = True
+                hits.append(hit)
+        if total == 0:
+            continue
+        order = np.argsort(-np.array(scores)) if scores else np.array([], dtype=int)
+        tp = np.array(hits, dtype=np.float64)[order]
+        tp_cum = np.cumsum(tp)
+        fp_cum = np.cumsum(1 - tp)
+        recall = tp_cum / total
+        precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-9)
+        aps.append(_average_precision(recall, precision))
+    return float(np.mean(aps)) if aps else 0.0
+
+def detection_agreement(predictions, references, iou_threshold=0.5):
+    """兩組檢測結果的一致度（F1）：類別相同且 IoU 達門檻視為一致"""
+    matched = total_pred = total_ref = 0
+    for preds, refs in zip(predictions, references):
+        total_pred += len(preds)
+        total_ref += len(refs)
+        if not preds or not refs:
+            continue
+        ious = box_iou([obj['bbox'] for obj in preds], [obj['bbox'] for obj in refs])
+        same = np.array([[p['class'] == r['class'] for r in refs] for p in preds])
+        ious = np.where(same, ious, 0.0)
+        used = np.zeros(len(refs), dtype=bool)
+        for i in np.argsort(-ious.max(axis=1)):
+            j = int(np.argmax(np.where(used, -1.0, ious[i])))
+            if not used[j] and ious[i, j] >= iou_threshold:
+                used[j] = True
+                matched += 1
+    if total_pred + total_ref == 0:
+        return 1.0
+    return 2 * matched / (total_pred + total_ref)
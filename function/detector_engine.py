@@ -0,0 +1,236 @@
+import os
+import ast
+import shutil
+import hashlib
+import cv2
+import numpy as np
+from config import DETECTOR_ENGINE, DETECTOR_WEIGHTS, DETECTOR_CONF, DETECTOR_IOU, ONNX_THREADS, ONNX_INT8, TRACKER_IOU, TRACKER_MAX_AGE
+from function.detection_metrics import box_iou
+
+def weights_hash(path):
+    """權重檔內容的雜湊值（前 12 碼），用來判斷匯出的模型是否過期"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:12]
+
+def onnx_path(weights, imgsz, suffix=''):
+    """權重對應的 ONNX 快取路徑（放在權重旁邊，以權重雜湊與輸入尺寸區分）"""
+    h, w = _pair(imgsz)
+    stem = os.path.splitext(weights)[0]
+    return f"{stem}-{weights_hash(weights)}-{h}x{w}{suffix}.onnx"
+
+def int8_path(model_path):
+    """FP32 ONNX 模型對應的 INT8 模型路徑"""
+    return os.path.splitext(model_path)[0] + '-int8.onnx'
+
+def export_onnx(weights, imgsz, batch=1):
+    """將 .pt 權重匯出為 ONNX，依權重雜湊、輸入尺寸與批次大小快取在權重旁邊"""
+    h, w = _pair(imgsz)
+    cached = onnx_path(weights, (h, w), f"-b{batch}" if batch > 1 else '')
+    if os.path.exists(cached):
+        return cached
+    print(f"匯出 ONNX 模型: {cached}")
+    from ultralytics import YOLO
+    exported = YOLO(weights).export(format='onnx', imgsz=[h, w], batch=batch, dynamic=False)
+    shutil.move(exported, cached)
+    return cached
+
+def _pair(imgsz):
+    if isinstance(imgsz, (tuple, list)):
+        return int(imgsz[0]), int(imgsz[1])
+    return int(imgsz), int(imgsz)
+
+class IouTracker:
+    """以 IoU 貪婪配對指定追蹤編號（給沒有內建追蹤器的推論引擎使用）"""
+
+    def __init__(self, iou_threshold=TRACKER_IOU, max_age=TRACKER_MAX_AGE, prefix=None):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.prefix = prefix  # 編號前綴，與其他追蹤器共用狀態表時避免編號重複
+        self.tracks = {}  # track_id -> {'bbox', 'class', 'age'}
+        self.next_id = 1
+
+    def update(self, detections):
+        """為 detections 填入 'track_id'"""
+        ids = list(self.tracks)
+        if ids and detections:
+            ious = box_iou([d['bbox'] for d in detections], [self.tracks[i]['bbox'] for i in ids])
+            same = np.array([[d['class'] == self.tracks[i]['class'] for i in ids] for d in detections])
+            ious = np.where(same, ious, 0.0)
+        else:
+            ious = np.zeros((len(detections), len(ids)))
+
+        assigned = set()
+        for di, ti in sorted(np.ndindex(ious.shape), key=lambda p: -ious[p]):
+            if ious[di, ti] < self.iou_threshold:
+                break
+            if detections[di].get('track_id') is not None or ids[ti] in assigned:
+                continue
+            detections[di]['track_id'] = ids[ti]
+            assigned.add(ids[ti])
+
+        for det in detections:
+            if det.get('track_id') is None:
+                det['track_id'] = f"{self.prefix}{self.next_id}" if self.prefix else self.next_id
+                self.next_id += 1
+            self.tracks[det['track_id']] = {'bbox': det['bbox'], 'class': det['class'], 'age': 0}
+        current = {det['track_id'] for det in detections}
+        for track_id in list(self.tracks):
+            if track_id not in current:
+                self.tracks[track_id]['age'] += 1
+                if self.tracks[track_id]['age'] > self.max_age:
+                    del self.tracks[track_id]
+        return detections
+
+    def reset(self):
+        self.tracks.clear()
+
+class UltralyticsEngine:
+    """以 ultralytics/PyTorch 執行推論，使用 ultralytics 內建的追蹤器"""
+
+    name = 'ultralytics'
+
+    def __init__(self, weights=DETECTOR_WEIGHTS, imgsz=640, conf=DETECTOR_CONF, iou=DETECTOR_IOU, batch=1):
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+        self.imgsz = max(_pair(imgsz))
+        self.conf = conf
+        self.iou = iou
+
+    def _convert(self, result):
+        objects = []
+        for box in result.boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            objects.append({
+                'class': result.names[int(box.cls[0])].lower(),
+                'bbox': (x1, y1, x2, y2),
+                'confidence': float(box.conf[0]),
+                'track_id': int(box.id[0]) if box.id is not None else None
+            })
+        return objects
+
+    def predict(self, image):
+        """單張推論（不追蹤）"""
+        results = self.model.predict(image, conf=self.conf, iou=self.iou, imgsz=self.imgsz, verbose=False)
+        return self._convert(results[0])
+
+    def predict_batch(self, images):
+        """多張影像一次推論（不追蹤），回傳每張的物件列表"""
+        results = self.model.predict(list(images), conf=self.conf, iou=self.iou, imgsz=self.imgsz, verbose=False)
+        return [self._convert(r) for r in results]
+
+    def detect(self, image):
+        """推論並追蹤，物件含 'track_id'"""
+        objects = []
+        for r in self.model.track(image, persist=True, stream=True, conf=self.conf, iou=self.iou, imgsz=self.imgsz):
+            objects.extend(self._convert(r))
+        return objects
+
+class OnnxEngine:
+    """以 ONNX Runtime 執行推論，前後處理（letterbox、NMS）以 OpenCV/NumPy 完成"""
+
+    name = 'onnx'
+
+    def __init__(self, weights=DETECTOR_WEIGHTS, imgsz=640, conf=DETECTOR_CONF, iou=DETECTOR_IOU, model_path=None, int8=ONNX_INT8, batch=1):
+        import onnxruntime as ort
+        self.input_h, self.input_w = _pair(imgsz)
+        if model_path is None:
+            model_path = export_onnx(weights, (self.input_h, self.input_w), batch)
+            if int8:
+                # INT8 模型只有通過 tools.quantize_detector 的精度檢查才會存在
+                if os.path.exists(int8_path(model_path)):
+                    model_path = int8_path(model_path)
+                else:
+                    print(f"找不到 INT8 模型 {int8_path(model_path)}，改用 FP32 模型")
+        options = ort.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        shape = self.session.get_inputs()[0].shape
+        if isinstance(shape[2], int) and isinstance(shape[3], int):
+            self.input_h, self.input_w = shape[2], shape[3]
+        self.batch = shape[0] if isinstance(shape[0], int) else batch
+        meta = self.session.get_modelmeta().custom_metadata_map
+        names = ast.literal_eval(meta['names']) if 'names' in meta else {}
+        self.names = {int(k): str(v).lower() for k, v in names.items()}
+        self.conf = conf
+        self.iou = iou
+        self.tracker = IouTracker()
+        self._blob = np.zeros((self.batch, 3, self.input_h, self.input_w), dtype=np.float32)
+        print(f"ONNX 模型: {model_path}（輸入 {self.batch}x{self.input_h}x{self.input_w}）")
+
+    def _letterbox(self, image, index=0):
+        """等比例縮放並置中補邊到模型輸入尺寸，寫入批次的第 index 張，回傳 (縮放比例, 左補邊, 上補邊)"""
+        h, w = image.shape[:2]
+        scale = min(self.input_h / h, self.input_w / w)
+        nh, nw = int(round(h * scale)), int(round(w * scale))
+        top = (self.input_h - nh) // 2
+        left = (self.input_w - nw) // 2
+        canvas = np.full((self.input_h, self.input_w, 3), 114, dtype=np.uint8)
+        canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        # BGR → RGB、HWC → CHW、0~1
+        np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), 1 / 255.0, out=self._blob[index], casting='unsafe')
+        return scale, left, top
+
+    def _postprocess(self, output, scale, left, top, shape):
+        """單張影像的輸出 (4 + 類別數, N) 轉為物件列表，含類別分開的 NMS"""
+        pred = output.T
+        scores = pred[:, 4:]
+        class_ids = np.argmax(scores, axis=1)
+        confs = scores[np.arange(len(scores)), class_ids]
+        keep = confs >= self.conf
+        if not np.any(keep):
+            return []
+        pred, class_ids, confs = pred[keep], class_ids[keep], confs[keep]
+        boxes = np.empty((len(pred), 4), dtype=np.float32)
+        boxes[:, 0] = (pred[:, 0] - pred[:, 2] / 2 - left) / scale
+        boxes[:, 1] = (pred[:, 1] - pred[:, 3] / 2 - top) / scale
+        boxes[:, 2] = (pred[:, 0] + pred[:, 2] / 2 - left) / scale
+        boxes[:, 3] = (pred[:, 1] + pred[:, 3] / 2 - top) / scale
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confs.tolist(), class_ids.tolist(), self.conf, self.iou)
+        objects = []
+        for i in np.asarray(indices).reshape(-1):
+            x1, y1, x2, y2 = map(int, boxes[i])
+            objects.append({
+                'class': self.names.get(int(class_ids[i]), str(int(class_ids[i]))),
+                'bbox': (x1, y1, x2, y2),
+                'confidence': float(confs[i])
+            })
+        return objects
+
+    def predict(self, image):
+        """單張推論（不追蹤）"""
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images):
+        """多張影像一次推論（不追蹤），張數超過模型批次大小時分次執行"""
+        objects = []
+        for i in range(0, len(images), self.batch):
+            chunk = images[i:i + self.batch]
+            params = [self._letterbox(image, j) for j, image in enumerate(chunk)]
+            output = self.session.run(None, {self.input_name: self._blob})[0]
+            for j, (image, (scale, left, top)) in enumerate(zip(chunk, params)):
+                objects.append(self._postprocess(output[j], scale, left, top, image.shape))
+        return objects
+
+    def detect(self, image):
+        """推論並追蹤，物件含 'track_id'"""
+        return self.tracker.update(self.predict(image))
+
+ENGINES = {
+    UltralyticsEngine.name: UltralyticsEngine,
+    OnnxEngine.name: OnnxEngine,
+}
+
+def create_engine(imgsz=640, engine=DETECTOR_ENGINE, **kwargs):
+    """依設定建立推論引擎"""
+    if engine not in ENGINES:
+        raise ValueError(f"未知的推論引擎: {engine}（可用: {', '.join(ENGINES)}）")
+    print(f"推論引擎: {engine}")
+    return ENGINES[engine](imgsz=imgsz, **kwargs)
@@ -1,5 +1,44 @@
+import math
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
 import DobotDllType as dType
-from config import X_Center, Y_Center, DOBOT_PORT, DOBOT_BAUDRATE
+from function.pick_planner import move_time
+from function.calibration import load_calibration
+from config import DOBOT_PORT, DOBOT_BAUDRATE, DOBOT_JOB_QUEUE_SIZE, DOBOT_JOB_TTL, DOBOT_POLL_INTERVAL_MS
+from config import BIN_POSITIONS, DOBOT_HOME, DOBOT_REACH_MIN, DOBOT_REACH_MAX, CONVEYOR_SPEED, CONVEYOR_INDEX_MS
+from config import ARM_SPEED_MM_S, ARM_MOVE_OVERHEAD_S, ARM_DESCEND_TIME_S, PICK_HANDLING_S, PLACE_HANDLING_S
+from config import DOBOT_STREAMING, DOBOT_STREAM_WINDOW, CALIBRATION_FILE
+
+class RobotJob:
+    """手臂工作項目，帶有檢測時間戳記與對應的 Future"""
+
+    def __init__(self, func, args, timestamp=None, on_start=None, indexed=False):
+        self.func = func
+        self.args = args
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.future = Future()
+        self.on_start = on_start
+        self.started = False
+        # 停帶夾取：座標在輸送帶停止時有效，以輸送帶是否移動過判斷，而不是檢測後經過的時間
+        self.indexed = indexed
+
+    def age(self):
+        """距離檢測時間已經過的秒數"""
+        return time.time() - self.timestamp
+
+    def start(self):
+        """工作開始實際動作時呼叫 on_start（只呼叫一次）"""
+        if self.started:
+            return
+        self.started = True
+        if self.on_start is not None:
+            try:
+                self.on_start()
+            except Exception as e:
+                print(f"工作開始回呼失敗: {e}")
 
 class DobotController:
     def __init__(self):
@@ -10,6 +49,20 @@ class DobotController:
             dType.DobotConnect.DobotConnect_Occupied: "DobotConnect_Occupied"
         }
         self.state = None
+        self.pose = DOBOT_HOME
+        self.calibration = load_calibration(CALIBRATION_FILE)
+        self.conveyor_running = False
+        self.jobs = queue.Queue(maxsize=DOBOT_JOB_QUEUE_SIZE)
+        self.job_ttl = DOBOT_JOB_TTL
+        self.dropped_jobs = 0
+        self._executor = None
+        self._executor_running = False
+        # 串流模式：裝置佇列持續執行，最多保留 DOBOT_STREAM_WINDOW 個工作在裝置上
+        self.streaming = False
+        self.busy_until = 0.0
+        self.belt_stopped_at = 0.0  # 最近一次輸送帶前進結束的（預估）時間
+        self._inflight = deque()  # (job, result, last_index)
+        self._queued_index = None
     
     def initialize(self):
         """初始化Dobot連接"""
@@ -29,70 +82,270 @@ class DobotController:
             dType.SetHOMECmd(self.api, temp=0, isQueued=1)
             lastIndex = dType.SetWAITCmd(self.api, 2000, isQueued=1)
             self._work(lastIndex)
+            if DOBOT_STREAMING:
+                dType.SetQueuedCmdStartExec(self.api)
+                self.streaming = True
+            self.start_executor()
+    
+    def start_executor(self):
+        """啟動手臂工作執行緒"""
+        if self._executor is not None and self._executor.is_alive():
+            return
+        self._executor_running = True
+        self._executor = threading.Thread(target=self._executor_loop, name='dobot-executor', daemon=True)
+        self._executor.start()
+    
+    def stop_executor(self):
+        """停止手臂工作執行緒並取消尚未執行的工作"""
+        self._executor_running = False
+        if self._executor is not None and self._executor is not threading.current_thread():
+            self._executor.join(timeout=1.0)
+        self._executor = None
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            job.future.cancel()
+        while self._inflight:
+            job, _, _ = self._inflight.popleft()
+            job.future.set_exception(RuntimeError("手臂工作執行緒已停止"))
+    
+    def _executor_loop(self):
+        """依序執行佇列中的工作，過期的工作直接丟棄"""
+        while self._executor_running:
+            if self.streaming:
+                self._poll_inflight()
+                if len(self._inflight) >= DOBOT_STREAM_WINDOW:
+                    dType.dSleep(DOBOT_POLL_INTERVAL_MS)
+                    continue
+            timeout = DOBOT_POLL_INTERVAL_MS / 1000 if self._inflight else 0.1
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if job.indexed:
+                if job.timestamp < self.belt_stopped_at:
+                    self.dropped_jobs += 1
+                    print("檢測後輸送帶已前進，丟棄座標已過期的夾取工作")
+                    job.future.cancel()
+                    continue
+            elif self.job_ttl and job.age() > self.job_ttl:
+                self.dropped_jobs += 1
+                print(f"丟棄過期工作（已過 {job.age():.2f} 秒）")
+                job.future.cancel()
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            if not self._inflight:
+                job.start()
+            self._queued_index = None
+            try:
+                result = job.func(*job.args)
+            except Exception as e:
+                print(f"手臂工作執行失敗: {e}")
+                job.future.set_exception(e)
+                continue
+            if self.streaming and self._queued_index is not None:
+                # 指令已排入裝置佇列，等執行到最後一個指令索引才算完成
+                self._inflight.append((job, result, self._queued_index))
+            else:
+                job.future.set_result(result)
+    
+    def _poll_inflight(self):
+        """依裝置目前執行的指令索引，完成已執行完畢的工作"""
+        if not self._inflight:
+            return
+        current = dType.GetQueuedCmdCurrentIndex(self.api)[0]
+        while self._inflight and self._inflight[0][2] <= current:
+            job, result, _ = self._inflight.popleft()
+            job.future.set_result(result)
+        if self._inflight:
+            self._inflight[0][0].start()
+        else:
+            self.busy_until = time.time()
+    
+    def _submit(self, func, args, timestamp, on_start=None, indexed=False):
+        """將工作放入佇列，佇列已滿時直接取消並回傳；手臂未連線時回傳已失敗的 Future
+
+        on_start 會在工作實際開始動作時呼叫（串流模式下為前一個工作完成時）。
+        """
+        job = RobotJob(func, args, timestamp, on_start, indexed)
+        if not self._executor_running:
+            # 未連線（或已停止）時沒有執行緒會處理工作，直接失敗，不讓呼叫端等到逾時
+            job.future.set_exception(RuntimeError("手臂未連線"))
+            return job.future
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self.dropped_jobs += 1
+            print("手臂工作佇列已滿，丟棄新工作")
+            job.future.cancel()
+        return job.future
+    
+    def submit_pick(self, cX, cY, tag_id, hei_z=8, timestamp=None, velocity=None, return_home=True, on_start=None):
+        """非阻塞夾取，回傳 Future；timestamp 為檢測時間
+
+        velocity 為輸送帶速度 (vx, vy)（像素/秒），有提供時輸送帶不停止，改為攔截夾取。
+        """
+        if velocity is not None:
+            if timestamp is None:
+                timestamp = time.time()
+            return self._submit(self.intercept_work, (cX, cY, tag_id, hei_z, timestamp, velocity, return_home), timestamp, on_start)
+        return self._submit(self.dobot_work, (cX, cY, tag_id, hei_z, return_home), timestamp, on_start, indexed=True)
+    
+    def return_home(self):
+        """回到待命位置"""
+        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, DOBOT_HOME[0], DOBOT_HOME[1], DOBOT_HOME[2], 0, 1)
+        lastIndex = dType.SetWAITCmd(self.api, 100, isQueued=1)
+        self._reserve(float(move_time(self.pose[:2], DOBOT_HOME[:2])))
+        self._work(lastIndex)
+        self.pose = DOBOT_HOME
+        return True
+    
+    def submit_return_home(self):
+        """非阻塞回到待命位置，回傳 Future"""
+        return self._submit(self.return_home, (), None)
+    
+    def submit_conveyor(self, timestamp=None, on_start=None):
+        """非阻塞運行輸送帶，回傳 Future"""
+        return self._submit(self.run_conveyor, (), timestamp, on_start)
+    
+    def submit_conveyor_state(self, running):
+        """非阻塞啟動或停止連續運轉的輸送帶，回傳 Future"""
+        return self._submit(self.set_conveyor, (running,), None)
     
     def _work(self, lastIndex):
-        """佇列釋放, 工作執行函數"""
+        """佇列釋放, 工作執行函數
+
+        串流模式下裝置佇列持續執行，只記錄最後的指令索引，不等待也不清除佇列。
+        """
+        if self.streaming:
+            self._queued_index = lastIndex[0]
+            return
         dType.SetQueuedCmdStartExec(self.api)
         while lastIndex[0] > dType.GetQueuedCmdCurrentIndex(self.api)[0]:
-            dType.dSleep(100)
+            dType.dSleep(DOBOT_POLL_INTERVAL_MS)
         dType.SetQueuedCmdClear(self.api)
     
-    def dobot_work(self, cX, cY, tag_id, hei_z):
-        """Dobot 工作函數"""
-        if (cY - Y_Center) >= 0:
-            offy = (cY - Y_Center) * 0.5001383
-        else:
-            offy = (cY - Y_Center) * 0.5043755
+    def pixel_to_robot(self, cX, cY):
+        """影像像素座標轉換為手臂座標 (obj_x, obj_y)"""
+        obj_x, obj_y = self.calibration.pixels_to_robot([[cX, cY]])[0]
+        return float(obj_x), float(obj_y)
+    
+    def pixels_to_robot(self, points):
+        """批次將 (N, 2) 像素座標轉換為 (N, 2) 手臂座標"""
+        return self.calibration.pixels_to_robot(points)
+    
+    def travel_time(self, x, y):
+        """估計手臂從目前位置移動到 (x, y) 並下降夾取所需的時間（秒）"""
+        dist = math.hypot(x - self.pose[0], y - self.pose[1])
+        return dist / ARM_SPEED_MM_S + ARM_MOVE_OVERHEAD_S + ARM_DESCEND_TIME_S
+    
+    def intercept_point(self, cX, cY, timestamp, velocity):
+        """預測手臂抵達時物件所在的手臂座標，回傳 (obj_x, obj_y, 抵達時間)"""
+        # 座標換算是在「檢測後輸送帶再走 CONVEYOR_INDEX_MS」的條件下標定的，需扣除這段位移
+        offset = CONVEYOR_INDEX_MS / 1000.0
+        # 串流模式下手臂要等前面排入的工作做完才會開始移動
+        now = max(time.time(), self.busy_until) if self.streaming else time.time()
+        obj_x, obj_y = self.pixel_to_robot(cX, cY)
+        arrive = now
+        # 抵達時間取決於目標位置，迭代數次求得攔截點
+        for _ in range(3):
+            arrive = now + self.travel_time(obj_x, obj_y)
+            dt = arrive - timestamp - offset
+            obj_x, obj_y = self.pixel_to_robot(cX + velocity[0] * dt, cY + velocity[1] * dt)
+        return obj_x, obj_y, arrive
+    
+    def _reserve(self, duration):
+        """累加串流模式下已排入裝置佇列的預估工作時間"""
+        self.busy_until = max(time.time(), self.busy_until) + duration
+    
+    def _mark_belt_index(self):
+        """記錄輸送帶前進一段的預估工作時間與停止時間"""
+        self._reserve(CONVEYOR_INDEX_MS / 1000.0)
+        self.belt_stopped_at = self.busy_until
 
-        if (cX - X_Center) >= 0:
-            offx = (X_Center - cX) * 0.4921233
-        else:
-            offx = (X_Center - cX) * 0.5138767
-        obj_x = 268.3032 + offx
-        obj_y = offy
+    def _belt_settled(self):
+        """非串流模式下工作完成時輸送帶一定已停止，以實際時間修正預估的停止時間"""
+        if not self.streaming:
+            self.belt_stopped_at = min(self.belt_stopped_at, time.time())
+
+    def in_reach(self, x, y):
+        """檢查座標是否在手臂可夾取範圍內"""
+        return DOBOT_REACH_MIN <= math.hypot(x, y) <= DOBOT_REACH_MAX
+    
+    def dobot_work(self, cX, cY, tag_id, hei_z, return_home=True):
+        """Dobot 工作函數（輸送帶前進固定時間後停止再夾取）"""
+        obj_x, obj_y = self.pixel_to_robot(cX, cY)
 
-        dType.SetEMotor(self.api, 0, 1, 12500, 1)
-        dType.SetWAITCmd(self.api, 4850, isQueued=1)
+        dType.SetEMotor(self.api, 0, 1, CONVEYOR_SPEED, 1)
+        dType.SetWAITCmd(self.api, CONVEYOR_INDEX_MS, isQueued=1)
         dType.SetEMotor(self.api, 0, 1, 0, 1)
         dType.SetWAITCmd(self.api, 100, isQueued=1)
+        self._mark_belt_index()
+        result = self._pick_and_place(obj_x, obj_y, tag_id, hei_z, return_home)
+        self._belt_settled()
+        return result
+    
+    def intercept_work(self, cX, cY, tag_id, hei_z, timestamp, velocity, return_home=True):
+        """輸送帶不停止，夾取物件在手臂抵達時的預測位置"""
+        obj_x, obj_y, arrive = self.intercept_point(cX, cY, timestamp, velocity)
+        if not self.in_reach(obj_x, obj_y):
+            print(f"預測位置 ({obj_x:.1f}, {obj_y:.1f}) 超出手臂範圍，放棄夾取")
+            return False
+        print(f"攔截夾取: ({obj_x:.1f}, {obj_y:.1f})，預計 {arrive - time.time():.2f} 秒後抵達")
+        return self._pick_and_place(obj_x, obj_y, tag_id, hei_z, return_home)
+    
+    def _pick_and_place(self, obj_x, obj_y, tag_id, hei_z, return_home=True):
+        """夾取 (obj_x, obj_y) 的物件並放到對應顏色的位置，return_home 為 False 時停在放置點上方"""
         dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, obj_x, obj_y, 50, 0, 1)
         dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, obj_x, obj_y, hei_z, 0, 1)
         dType.SetEndEffectorSuctionCup(self.api, 1, 1, isQueued=1)
         dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, obj_x, obj_y, 70, 0, 1)
 
         print("color_state = " + str(tag_id))
-        if tag_id == "yellow":
-            goal_x = 10
-            goal_y = 213
-        elif tag_id == "blue":
-            goal_x = 150
-            goal_y = 213
-        elif tag_id == "red":
-            goal_x = 80
-            goal_y = 213
-        elif tag_id == "green":
-            goal_x = 220
-            goal_y = 213
+        goal_x, goal_y = BIN_POSITIONS[tag_id]
 
-        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, goal_x, -goal_y, 70, 0, 1)
-        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, goal_x, -goal_y, 40, 0, 1)
+        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, goal_x, goal_y, 70, 0, 1)
+        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, goal_x, goal_y, 40, 0, 1)
         dType.SetEndEffectorSuctionCup(self.api, 1, 0, isQueued=1)
-        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, goal_x, -goal_y, 70, 0, 1)
-        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, 270, 0, 50, 0, 1)
+        dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, goal_x, goal_y, 70, 0, 1)
+        if return_home:
+            dType.SetPTPCmd(self.api, dType.PTPMode.PTPMOVJXYZMode, DOBOT_HOME[0], DOBOT_HOME[1], DOBOT_HOME[2], 0, 1)
         lastIndex = dType.SetWAITCmd(self.api, 100, isQueued=1)
+        end_pose = DOBOT_HOME if return_home else (goal_x, goal_y, 70)
+        self._reserve(float(move_time(self.pose[:2], (obj_x, obj_y))) + PICK_HANDLING_S
+                      + float(move_time((obj_x, obj_y), (goal_x, goal_y))) + PLACE_HANDLING_S
+                      + float(move_time((goal_x, goal_y), end_pose[:2])))
         self._work(lastIndex)
+        self.pose = end_pose
         print("End")
+        return True
     
     def run_conveyor(self):
         """輸送帶運行函數"""
-        dType.SetEMotor(self.api, 0, 1, 12500, 1)
-        dType.SetWAITCmd(self.api, 4850, isQueued=1)
+        if self.conveyor_running:
+            print("輸送帶連續運轉中，物件直接送走")
+            return True
+        dType.SetEMotor(self.api, 0, 1, CONVEYOR_SPEED, 1)
+        dType.SetWAITCmd(self.api, CONVEYOR_INDEX_MS, isQueued=1)
         dType.SetEMotor(self.api, 0, 1, 0, 1)
         lastIndex = dType.SetWAITCmd(self.api, 100, isQueued=1)
+        self._mark_belt_index()
         self._work(lastIndex)
+        self._belt_settled()
+        return True
+    
+    def set_conveyor(self, running):
+        """立即啟動或停止輸送帶（連續運轉模式使用）"""
+        dType.SetEMotor(self.api, 0, 1, CONVEYOR_SPEED if running else 0, 0)
+        self.conveyor_running = running
+        return True
     
     def disconnect(self):
         """斷開Dobot連接"""
+        self.stop_executor()
         if self.api:
             dType.SetQueuedCmdStopExec(self.api)
             dType.DisconnectDobot(self.api)
\ No newline at end of file
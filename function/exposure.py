@@ -0,0 +1,102 @@
+import time
+import functools
+import cv2
+import numpy as np
+from config import Gamma_Value, EXPOSURE_AUTO, EXPOSURE_TARGET, EXPOSURE_GAMMA_RANGE, EXPOSURE_GAMMA_STEP
+from config import EXPOSURE_HYSTERESIS, EXPOSURE_SCALE
+
+@functools.lru_cache(maxsize=128)
+def gamma_lut(gamma):
+    """伽馬值對應的 256 項查表（輸出 = (輸入 / 255) ^ (1 / gamma) * 255），依伽馬值快取"""
+    table = (np.arange(256) / 255.0) ** (1.0 / gamma) * 255
+    table = table.astype(np.uint8)
+    table.flags.writeable = False
+    return table
+
+class ExposureNormalizer:
+    """依遮罩區域亮度分佈的中位數自動選擇伽馬值，並以一次 cv2.LUT 校正 ROI
+
+    亮度由縮小後的灰階直方圖估計；伽馬值量化為 EXPOSURE_GAMMA_STEP 的倍數以重用查表，
+    與目前的值相差超過 EXPOSURE_HYSTERESIS 才切換，避免在兩個值之間來回跳動。
+    EXPOSURE_AUTO 為 False 時固定使用 Gamma_Value。
+    """
+
+    def __init__(self, mask=None, gamma=Gamma_Value, auto=EXPOSURE_AUTO, target=EXPOSURE_TARGET,
+                 gamma_range=EXPOSURE_GAMMA_RANGE, step=EXPOSURE_GAMMA_STEP,
+                 hysteresis=EXPOSURE_HYSTERESIS, scale=EXPOSURE_SCALE):
+        self.mask = mask
+        self.auto = auto
+        self.target = target
+        self.gamma_range = gamma_range
+        self.step = step
+        self.hysteresis = hysteresis
+        self.scale = scale
+        self.gamma = self._quantize(gamma)
+        self.brightness = None
+        self.switches = 0
+        self._small = None
+        self._gray = None
+        self._small_mask = None
+        self._cost_ms = 0.0
+
+    def _quantize(self, gamma):
+        gamma = float(np.clip(gamma, *self.gamma_range))
+        return round(round(gamma / self.step) * self.step, 4)
+
+    def _ensure(self, shape):
+        """依影像尺寸配置縮小影像的緩衝區與縮小後的遮罩"""
+        size = (max(1, int(shape[1] * self.scale)), max(1, int(shape[0] * self.scale)))
+        if self._gray is not None and self._gray.shape == (size[1], size[0]):
+            return
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._small_mask = None
+        if self.mask is not None:
+            mask = self.mask if self.mask.ndim == 2 else cv2.cvtColor(self.mask, cv2.COLOR_BGR2GRAY)
+            mask = cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)
+            self._small_mask = (mask > 0).astype(np.uint8) * 255
+
+    def measure(self, image):
+        """遮罩區域的亮度中位數（0~1），遮罩區域為空時回傳 None"""
+        self._ensure(image.shape)
+        cv2.resize(image, (self._gray.shape[1], self._gray.shape[0]), dst=self._small, interpolation=cv2.INTER_NEAREST)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        hist = cv2.calcHist([self._gray], [0], self._small_mask, [64], [0, 256]).ravel()
+        total = hist.sum()
+        if total == 0:
+            return None
+        median_bin = int(np.searchsorted(np.cumsum(hist), total / 2))
+        return (median_bin + 0.5) / 64
+
+    def update(self, image):
+        """依本張影像的亮度更新伽馬值，回傳目前的伽馬值"""
+        if not self.auto:
+            return self.gamma
+        brightness = self.measure(image)
+        if brightness is None:
+            return self.gamma
+        self.brightness = brightness
+        # 使中位數對應到目標亮度：brightness ^ (1 / gamma) = target
+        desired = self._quantize(np.log(max(brightness, 1e-3)) / np.log(self.target))
+        if abs(desired - self.gamma) > self.hysteresis:
+            self.gamma = desired
+            self.switches += 1
+        return self.gamma
+
+    def apply(self, image, dst=None):
+        """更新伽馬值並校正影像，dst 為 image 時就地校正（image 需是可覆寫的緩衝區）"""
+        start = time.perf_counter()
+        gamma = self.update(image)
+        if gamma != 1.0:
+            image = cv2.LUT(image, gamma_lut(gamma), dst=dst)
+        ms = (time.perf_counter() - start) * 1000
+        self._cost_ms = ms if self._cost_ms == 0 else 0.9 * self._cost_ms + 0.1 * ms
+        return image
+
+    def stats(self):
+        return {
+            'gamma': self.gamma,
+            'brightness': round(self.brightness, 3) if self.brightness is not None else None,
+            'switches': self.switches,
+            'cost_ms': round(self._cost_ms, 3),
+        }
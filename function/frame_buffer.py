@@ -0,0 +1,38 @@
+import os
+import threading
+
+
+class FrameBuffer:
+    """保存最新一張已編碼的 JPEG，所有觀看者共用同一份位元組，新增觀看者不需重複編碼"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._jpg = None
+        self._seq = None
+        self._etag = None
+        # 程式重新啟動後序號會重來，ETag 加上啟動識別碼避免與舊的快取相同
+        self._boot = os.urandom(4).hex()
+        self.published = 0
+
+    def publish(self, jpg, seq):
+        """更新最新影像並喚醒等待中的觀看者"""
+        with self._cond:
+            self._jpg = jpg
+            self._seq = seq
+            self._etag = f"{self._boot}-{seq}"
+            self.published += 1
+            self._cond.notify_all()
+
+    def latest(self):
+        """回傳 (JPEG, ETag, 序號)，尚無影像時回傳 None"""
+        with self._cond:
+            if self._jpg is None:
+                return None
+            return self._jpg, self._etag, self._seq
+
+    def wait_newer(self, etag, timeout=None):
+        """等待 ETag 與 etag 不同的影像，逾時回傳 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._jpg is not None and self._etag != etag, timeout):
+                return None
+            return self._jpg, self._etag, self._seq
@@ -0,0 +1,94 @@
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from config import STREAM_MAX_INFLIGHT, STREAM_ACK_TIMEOUT
+
+class Subscriber:
+    """單一訂閱者的傳送狀態"""
+
+    def __init__(self):
+        self.inflight = OrderedDict()  # 尚未確認的影像：token -> 送出時間
+        self.pending = None      # 等待送出的最新一張
+        self.sent = 0
+        self.skipped = 0
+
+class FrameFanout:
+    """把已編碼的影像分送給所有訂閱者（每張只編碼一次）
+
+    每個訂閱者未確認的影像達上限時只保留最新一張，確認後立即送出，中間的影像直接跳過，
+    慢的前端不會在 Socket.IO 的傳送緩衝中累積舊影像，也不會拖慢其他前端。
+    emit 為 socketio.emit，需支援 to= 與 callback=（收到確認時呼叫）。
+    """
+
+    def __init__(self, emit, event, max_inflight=STREAM_MAX_INFLIGHT, ack_timeout=STREAM_ACK_TIMEOUT):
+        self.emit = emit
+        self.event = event
+        self.max_inflight = max_inflight
+        self.ack_timeout = ack_timeout
+        self._subscribers = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, sid):
+        with self._lock:
+            self._subscribers.setdefault(sid, Subscriber())
+
+    def remove(self, sid):
+        with self._lock:
+            self._subscribers.pop(sid, None)
+
+    def _expire(self, subscriber, now):
+        while subscriber.inflight and now - next(iter(subscriber.inflight.values())) > self.ack_timeout:
+            subscriber.inflight.popitem(last=False)
+
+    def publish(self, payload):
+        """分送一張影像，回傳實際送出的訂閱者數"""
+        now = time.time()
+        targets = []
+        with self._lock:
+            for sid, subscriber in self._subscribers.items():
+                self._expire(subscriber, now)
+                if len(subscriber.inflight) < self.max_inflight:
+                    if subscriber.pending is not None:
+                        # 逾時後直接送新影像，等待中的舊影像不再送出
+                        subscriber.pending = None
+                        subscriber.skipped += 1
+                    token = next(self._tokens)
+                    subscriber.inflight[token] = now
+                    subscriber.sent += 1
+                    targets.append((sid, token))
+                else:
+                    if subscriber.pending is not None:
+                        subscriber.skipped += 1
+                    subscriber.pending = payload
+        # emit 可能阻塞，不在鎖內呼叫
+        for sid, token in targets:
+            self._send(sid, token, payload)
+        return len(targets)
+
+    def _send(self, sid, token, payload):
+        self.emit(self.event, payload, to=sid, callback=lambda *args: self._on_ack(sid, token))
+
+    def _on_ack(self, sid, token):
+        """訂閱者確認收到 token 對應的影像，若有等待中的最新影像就接著送出
+
+        已逾時移除的影像晚到的確認直接忽略，不會釋放其他尚未確認的影像的名額。
+        """
+        with self._lock:
+            subscriber = self._subscribers.get(sid)
+            if subscriber is None or subscriber.inflight.pop(token, None) is None:
+                return
+            payload = subscriber.pending
+            if payload is None or len(subscriber.inflight) >= self.max_inflight:
+                return
+            subscriber.pending = None
+            token = next(self._tokens)
+            subscriber.inflight[token] = time.time()
+            subscriber.sent += 1
+        self._send(sid, token, payload)
+
+    def stats(self):
+        with self._lock:
+            return {sid: {'sent': s.sent, 'skipped': s.skipped, 'inflight': len(s.inflight)}
+                    for sid, s in self._subscribers.items()}
@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+from config import KEYFRAME_MIN_INTERVAL, KEYFRAME_MAX_INTERVAL, KEYFRAME_MAX_DRIFT
+
+# 每個框內取 3x3 個點做光流
+_GRID = np.array([(fx, fy) for fy in (0.25, 0.5, 0.75) for fx in (0.25, 0.5, 0.75)], dtype=np.float32)
+
+class KeyframeTracker:
+    """關鍵影格之間以光流推移檢測框，檢測器只需每 N 張執行一次
+
+    N 依物件移動速度調整：移動越快、越早重新檢測，讓兩次檢測間的位移不超過 KEYFRAME_MAX_DRIFT。
+    座標皆為整張影像座標，offset 為輸入灰階影像（ROI 裁切）左上角在整張影像中的位置。
+    """
+
+    def __init__(self, offset=(0, 0)):
+        self.offset = np.array(offset, dtype=np.float32)
+        self.prev_gray = None
+        self.objects = []
+        self.interval = KEYFRAME_MIN_INTERVAL
+        self.frames_since_key = 0
+        self.speed = 0.0  # 像素/張
+        self.keyframes = 0
+        self.propagated = 0
+        self._force = True
+
+    def request_keyframe(self):
+        """要求下一張影像執行檢測器"""
+        self._force = True
+
+    def keyframe_due(self):
+        return self._force or self.prev_gray is None or self.frames_since_key >= self.interval
+
+    def keyframe(self, gray, objects):
+        """以檢測器結果重設追蹤狀態"""
+        self.prev_gray = gray
+        self.objects = [dict(obj) for obj in objects]
+        self.frames_since_key = 0
+        self.keyframes += 1
+        self._force = False
+
+    def propagate(self, gray):
+        """以光流推移上一張的檢測框，回傳新的物件列表"""
+        self.frames_since_key += 1
+        self.propagated += 1
+        if not self.objects:
+            self.prev_gray = gray
+            self._update_interval()
+            return []
+
+        boxes = np.array([obj['bbox'] for obj in self.objects], dtype=np.float32) - np.tile(self.offset, 2)
+        sizes = boxes[:, 2:] - boxes[:, :2]
+        points = (boxes[:, None, :2] + _GRID[None, :, :] * sizes[:, None, :]).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None,
+                                                    winSize=(21, 21), maxLevel=2)
+        shift = (moved - points).reshape(len(boxes), len(_GRID), 2)
+        good = status.reshape(len(boxes), len(_GRID)).astype(bool)
+
+        speeds = []
+        result = []
+        for obj, d, ok in zip(self.objects, shift, good):
+            if ok.any():
+                dx, dy = np.median(d[ok], axis=0)
+                obj['velocity'] = (float(dx), float(dy))
+            else:
+                # 光流失敗時以上一次的位移外插
+                dx, dy = obj.get('velocity', (0.0, 0.0))
+            x1, y1, x2, y2 = obj['bbox']
+            x1, y1, x2, y2 = int(round(x1 + dx)), int(round(y1 + dy)), int(round(x2 + dx)), int(round(y2 + dy))
+            obj['bbox'] = (x1, y1, x2, y2)
+            obj['center'] = ((x1 + x2) // 2, (y1 + y2) // 2)
+            speeds.append(np.hypot(dx, dy))
+            out = dict(obj)
+            out.pop('velocity', None)
+            result.append(out)
+
+        self.speed = 0.7 * self.speed + 0.3 * float(max(speeds))
+        self.prev_gray = gray
+        self._update_interval()
+        return result
+
+    def _update_interval(self):
+        """依目前速度調整關鍵影格間隔"""
+        if self.speed <= 1e-3:
+            self.interval = KEYFRAME_MAX_INTERVAL
+        else:
+            self.interval = int(np.clip(KEYFRAME_MAX_DRIFT / self.speed, KEYFRAME_MIN_INTERVAL, KEYFRAME_MAX_INTERVAL))
+
+    def stats(self):
+        total = self.keyframes + self.propagated
+        return {
+            'interval': self.interval,
+            'speed_px_per_frame': round(self.speed, 2),
+            'keyframe_ratio': round(self.keyframes / total, 3) if total else 0.0,
+        }
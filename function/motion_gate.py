@@ -0,0 +1,73 @@
+import time
+import cv2
+import numpy as np
+from config import MOTION_SCALE, MOTION_PIXEL_THRESHOLD, MOTION_THRESHOLD, MOTION_MAX_STALE
+
+class MotionGate:
+    """以縮小影像的差異判斷場景是否變化，靜止時跳過 YOLO 推論"""
+
+    def __init__(self, mask=None, scale=MOTION_SCALE, threshold=MOTION_THRESHOLD, max_stale=MOTION_MAX_STALE):
+        self.scale = scale
+        self.threshold = threshold
+        self.max_stale = max_stale
+        self.mask = mask
+        self._small_mask = None
+        self._mask_area = None
+        self.reference = None
+        self.last_run = 0.0
+        self.last_change = 0.0
+        self.total = 0
+        self.skipped = 0
+        self._inference_ms = 0.0
+
+    def _downscale(self, image):
+        small = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self.mask is not None and self._small_mask is None:
+            mask = self.mask if self.mask.ndim == 2 else cv2.cvtColor(self.mask, cv2.COLOR_BGR2GRAY)
+            mask = cv2.resize(mask, (small.shape[1], small.shape[0]), interpolation=cv2.INTER_NEAREST)
+            self._small_mask = (mask > 0).astype(np.uint8) * 255
+            self._mask_area = max(cv2.countNonZero(self._small_mask), 1)
+        return small
+
+    def should_run(self, image, timestamp=None):
+        """判斷本張影像是否需要執行推論"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.total += 1
+        small = self._downscale(image)
+        run = self.reference is None or self.reference.shape != small.shape
+        if not run:
+            diff = cv2.absdiff(small, self.reference)
+            _, changed = cv2.threshold(diff, MOTION_PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY)
+            if self._small_mask is not None:
+                cv2.bitwise_and(changed, self._small_mask, dst=changed)
+                area = self._mask_area
+            else:
+                area = changed.size
+            self.last_change = cv2.countNonZero(changed) / area
+            run = self.last_change > self.threshold or timestamp - self.last_run > self.max_stale
+        if run:
+            # 只在推論時更新參考影像，緩慢的變化也會累積到門檻
+            self.reference = small
+            self.last_run = timestamp
+        else:
+            self.skipped += 1
+        return run
+
+    def record_inference(self, seconds):
+        """記錄一次推論耗時，用於估計跳過推論省下的時間"""
+        ms = seconds * 1000
+        self._inference_ms = ms if self._inference_ms == 0 else 0.9 * self._inference_ms + 0.1 * ms
+
+    def stats(self):
+        """跳過比例與估計省下的推論時間"""
+        return {
+            'frames': self.total,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skipped / self.total, 3) if self.total else 0.0,
+            'last_change': round(self.last_change, 4),
+            'inference_ms': round(self._inference_ms, 1),
+            'saved_ms': round(self.skipped * self._inference_ms, 1),
+        }
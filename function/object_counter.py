@@ -6,9 +6,14 @@ class ObjectCounter:
         self.object_counts = object_counts_init.copy()
         self.total_objects = 0
         self.good_rate = 0.0
+        self.counted_ids = set()
     
-    def update_counts(self, class_name):
-        """更新物件計數並傳送到前端"""
+    def update_counts(self, class_name, track_id=None):
+        """更新物件計數並傳送到前端；同一追蹤編號只計數一次，已計數回傳 False"""
+        if track_id is not None:
+            if track_id in self.counted_ids:
+                return False
+            self.counted_ids.add(track_id)
         self.object_counts[class_name] = self.object_counts.get(class_name, 0) + 1
         self.total_objects += 1
         good_objects = self.total_objects - self.object_counts.get('unknown', 0) - self.object_counts.get('broken', 0)
@@ -18,9 +23,11 @@ class ObjectCounter:
             'total': self.total_objects,
             'good_rate': round(self.good_rate, 2)
         })
+        return True
     
     def reset_counts(self):
         """重置計數"""
         self.object_counts = object_counts_init.copy()
         self.total_objects = 0
-        self.good_rate = 0.0
\ No newline at end of file
+        self.good_rate = 0.0
+        self.counted_ids.clear()
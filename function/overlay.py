@@ -0,0 +1,33 @@
+import cv2
+from config import color_map
+
+def draw_detections(image, model_objects, unknown_objects):
+    """在影像上繪製檢測框（會修改傳入的影像，需要保留原始畫面時請先複製）"""
+    # 繪製YOLO檢測到的物件
+    for obj in model_objects:
+        x1, y1, x2, y2 = obj['bbox']
+        box_color = color_map.get(obj['class'], (255, 255, 255))
+        label = f"{obj['class']}"
+        cv2.rectangle(image, (x1, y1), (x2, y2), box_color, 2)
+        cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+
+    # 繪製未知物件
+    for obj in unknown_objects:
+        x1, y1, x2, y2 = obj['bbox']
+        cv2.rectangle(image, (x1, y1), (x2, y2), (255, 255, 255), 2)
+        cv2.putText(image, obj['class'], (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    return image
+
+def detections_payload(seq, shape, model_objects, unknown_objects):
+    """前端繪製檢測框用的資料：影像序號、影像尺寸與各物件的類別、框、信心值、追蹤編號"""
+    objects = []
+    for obj in model_objects:
+        objects.append({
+            'class': obj['class'],
+            'bbox': [int(v) for v in obj['bbox']],
+            'confidence': round(float(obj['confidence']), 3),
+            'track_id': obj.get('track_id')
+        })
+    for obj in unknown_objects:
+        objects.append({'class': 'unknown', 'bbox': [int(v) for v in obj['bbox']]})
+    return {'seq': seq, 'width': shape[1], 'height': shape[0], 'objects': objects}
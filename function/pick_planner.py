@@ -0,0 +1,115 @@
+import itertools
+import numpy as np
+from config import ARM_SPEED_MM_S, ARM_MOVE_OVERHEAD_S, PICK_HANDLING_S, PLACE_HANDLING_S, PLANNER_EXACT_MAX
+
+def move_time(a, b):
+    """估計手臂由 a 移動到 b 的時間（秒），a、b 可為 (..., 2) 陣列"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    return np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1]) / ARM_SPEED_MM_S + ARM_MOVE_OVERHEAD_S
+
+def _cost_tables(start, jobs, end):
+    """建立成本表：起點到各工作、工作之間、工作到終點的時間"""
+    picks = np.array([job[0] for job in jobs], dtype=np.float64)
+    bins = np.array([job[1] for job in jobs], dtype=np.float64)
+    # 每個工作本身：夾取點 → 放置點
+    service = move_time(picks, bins) + PICK_HANDLING_S + PLACE_HANDLING_S
+    first = move_time(np.asarray(start, dtype=np.float64)[:2], picks) + service
+    # between[i, j]：完成工作 i（位於放置點 i）後接著做工作 j
+    between = move_time(bins[:, None, :], picks[None, :, :]) + service[None, :]
+    if end is None:
+        last = np.zeros(len(jobs))
+    else:
+        last = move_time(bins, np.asarray(end, dtype=np.float64)[:2])
+    return first, between, last
+
+def _order_cost(order, first, between, last):
+    cost = first[order[0]] + last[order[-1]]
+    for i, j in zip(order, order[1:]):
+        cost += between[i, j]
+    return cost
+
+def route_time(start, jobs, order, end=None, return_home_each=False, index_time=0.0):
+    """估計依 order 執行所有工作的總時間（秒）
+
+    return_home_each 為 True 時每個工作結束都回到 end（現行做法）。
+    index_time 為每個工作開始前輸送帶前進的時間（停帶夾取為 CONVEYOR_INDEX_MS，邊走邊夾為 0）。
+    """
+    if not order:
+        return 0.0
+    index = index_time * len(order)
+    first, between, last = _cost_tables(start, jobs, end)
+    if not return_home_each or end is None:
+        return float(_order_cost(list(order), first, between, last)) + index
+    # 每次都從 end 出發再回到 end
+    home_first, _, _ = _cost_tables(end, jobs, end)
+    return float(first[order[0]] + last[order[0]] + sum(home_first[j] + last[j] for j in order[1:])) + index
+
+def _solve_exact(first, between, last):
+    """Held-Karp 動態規劃求最短順序（適用於少量工作）"""
+    n = len(first)
+    full = (1 << n) - 1
+    best = {(1 << j, j): (first[j], None) for j in range(n)}
+    for size in range(2, n + 1):
+        for subset in itertools.combinations(range(n), size):
+            mask = 0
+            for j in subset:
+                mask |= 1 << j
+            for j in subset:
+                prev_mask = mask & ~(1 << j)
+                best[(mask, j)] = min(
+                    (best[(prev_mask, i)][0] + between[i, j], i)
+                    for i in subset if i != j
+                )
+    cost, j = min((best[(full, j)][0] + last[j], j) for j in range(n))
+    order = []
+    mask = full
+    while j is not None:
+        order.append(j)
+        _, prev = best[(mask, j)]
+        mask &= ~(1 << j)
+        j = prev
+    return order[::-1]
+
+def _solve_greedy(first, between, last):
+    """最近鄰貪婪解，再以 2-opt 改善"""
+    n = len(first)
+    remaining = set(range(n))
+    current = int(np.argmin(first))
+    order = [current]
+    remaining.discard(current)
+    while remaining:
+        current = min(remaining, key=lambda j: between[current, j])
+        order.append(current)
+        remaining.discard(current)
+
+    best_cost = _order_cost(order, first, between, last)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            for k in range(i + 1, n):
+                candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                cost = _order_cost(candidate, first, between, last)
+                if cost < best_cost - 1e-9:
+                    order, best_cost = candidate, cost
+                    improved = True
+    return order
+
+def next_pick(start, jobs, end=None):
+    """只執行一個工作時（停帶夾取每次只夾一個），回傳從 start 出發、完成後回到 end 最快的工作索引"""
+    first, _, last = _cost_tables(start, jobs, end)
+    return int(np.argmin(first + last))
+
+def plan_pick_order(start, jobs, end=None):
+    """規劃夾取順序，使總移動時間最短
+
+    start 為手臂目前位置 (x, y[, z])，jobs 為 [(夾取點 (x, y), 放置點 (x, y)), ...]，
+    end 為最後要回到的位置（None 表示不回去）。回傳 jobs 的索引順序。
+    """
+    if len(jobs) <= 1:
+        return list(range(len(jobs)))
+    first, between, last = _cost_tables(start, jobs, end)
+    if len(jobs) <= PLANNER_EXACT_MAX:
+        return _solve_exact(first, between, last)
+    return _solve_greedy(first, between, last)
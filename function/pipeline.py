@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import deque
+
+
+class LatestQueue:
+    """有界佇列，滿了就丟掉最舊的項目（drop-oldest）"""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """放入項目，若佇列已滿則丟棄最舊的一筆"""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取出最舊的項目，逾時回傳 None"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        """清空佇列"""
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    """單一階段的吞吐量與佇列深度統計"""
+
+    def __init__(self, name, window=2.0):
+        self.name = name
+        self.window = window
+        self.processed = 0
+        self.last_latency = 0.0
+        self._stamps = deque()
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        """記錄一次處理完成"""
+        now = time.time()
+        with self._lock:
+            self.processed += 1
+            self.last_latency = latency
+            self._stamps.append(now)
+            while self._stamps and now - self._stamps[0] > self.window:
+                self._stamps.popleft()
+
+    def throughput(self):
+        """最近 window 秒內的每秒處理數"""
+        now = time.time()
+        with self._lock:
+            while self._stamps and now - self._stamps[0] > self.window:
+                self._stamps.popleft()
+            return len(self._stamps) / self.window
+
+
+class PipelineStage(threading.Thread):
+    """管線階段：從 input_queue 取資料交給 handler，結果放入 output_queue
+
+    input_queue 為 None 時代表來源階段，handler 不帶參數直接產生資料。
+    handler 回傳 None 表示本次沒有輸出。
+    """
+
+    def __init__(self, name, handler, input_queue=None, output_queue=None, poll_interval=0.1):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.poll_interval = poll_interval
+        self.stats = StageStats(name)
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            if self.input_queue is not None:
+                item = self.input_queue.get(timeout=self.poll_interval)
+                if item is None:
+                    continue
+            start = time.time()
+            try:
+                if self.input_queue is not None:
+                    result = self.handler(item)
+                else:
+                    result = self.handler()
+            except Exception as e:
+                print(f"[{self.name}] 階段執行錯誤: {e}")
+                time.sleep(self.poll_interval)
+                continue
+            self.stats.record(time.time() - start)
+            if result is not None and self.output_queue is not None:
+                self.output_queue.put(result)
+
+    def stop(self):
+        self.running = False
+
+    def snapshot(self):
+        """回傳本階段的統計資料"""
+        return {
+            'fps': round(self.stats.throughput(), 2),
+            'processed': self.stats.processed,
+            'latency_ms': round(self.stats.last_latency * 1000, 1),
+            'queue_depth': len(self.input_queue) if self.input_queue is not None else 0,
+            'dropped': self.input_queue.dropped if self.input_queue is not None else 0,
+        }
+
+
+class Pipeline:
+    """多階段管線，負責啟動、停止與彙整統計"""
+
+    def __init__(self):
+        self.stages = []
+
+    def add_stage(self, stage):
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            if stage is not threading.current_thread():
+                stage.join(timeout=1.0)
+
+    def is_running(self):
+        return any(stage.is_alive() for stage in self.stages)
+
+    def stats(self):
+        return {stage.name: stage.snapshot() for stage in self.stages}
@@ -0,0 +1,25 @@
+import os
+import json
+
+def load_runtime_config(path):
+    """載入調校工具產生的執行期設定，檔案不存在或格式錯誤時回傳空 dict"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"讀取執行期設定失敗: {e}")
+        return {}
+    if not isinstance(data, dict):
+        print(f"執行期設定格式錯誤: {path}")
+        return {}
+    return data
+
+def update_runtime_config(path, **values):
+    """更新執行期設定中的部分欄位，保留其他工具寫入的欄位"""
+    data = load_runtime_config(path)
+    data.update(values)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return data
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+from config import kernel, SEGMENT_V_THRESHOLD
+
+class Segmenter:
+    """以預先配置的緩衝區執行 ROI 裁切與非黑色區域分割，每張影像不配置新的影像記憶體
+
+    原本轉換 HSV 後以 inRange 取 V >= 門檻，而 V 就是 max(B, G, R)，只計算這個通道即可。
+    回傳的影像都是緩衝區，下一次呼叫會被覆寫。
+    """
+
+    def __init__(self, roi=None, roi_mask=None, threshold=SEGMENT_V_THRESHOLD, morph_kernel=kernel):
+        self.roi = roi
+        self.roi_mask = roi_mask
+        self.threshold = threshold
+        self.kernel = morph_kernel
+        self._crop = None
+        self._value = None
+        self._opened = None
+
+    def _ensure(self, shape):
+        """影像尺寸改變時才重新配置緩衝區"""
+        if self._value is None or self._value.shape != shape[:2]:
+            self._crop = np.empty(shape, dtype=np.uint8) if self.roi is not None else None
+            self._value = np.empty(shape[:2], dtype=np.uint8)
+            self._opened = np.empty(shape[:2], dtype=np.uint8)
+
+    def crop(self, image):
+        """裁切 ROI 並套用遮罩，回傳 (遮罩後影像, 左上角座標)"""
+        if self.roi is None:
+            self._ensure(image.shape)
+            return image, (0, 0)
+        x0, y0, w, h = self.roi
+        self._ensure((h, w, image.shape[2]))
+        cv2.bitwise_and(image[y0:y0 + h, x0:x0 + w], self.roi_mask, dst=self._crop)
+        return self._crop, (x0, y0)
+
+    def segment(self, image):
+        """回傳非黑色區域（V >= 門檻）經開運算後的二值遮罩"""
+        self._ensure(image.shape)
+        value = self._value
+        np.maximum(image[:, :, 0], image[:, :, 1], out=value)
+        np.maximum(value, image[:, :, 2], out=value)
+        cv2.threshold(value, self.threshold - 1, 255, cv2.THRESH_BINARY, dst=value)
+        cv2.morphologyEx(value, cv2.MORPH_OPEN, self.kernel, dst=self._opened)
+        return self._opened
@@ -0,0 +1,121 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, TimeoutError
+from config import sound_map, AUDIO_DONE_TIMEOUT, PICK_DONE_TIMEOUT, CONVEYOR_DONE_TIMEOUT, AUDIO_LEAD_TIME
+from config import PICK_ON_THE_MOVE, DOBOT_JOB_QUEUE_SIZE
+
+class ActionSequencer:
+    """依實際完成訊號串接語音、夾取與輸送帶動作，取代固定的 sleep"""
+
+    def __init__(self, audio, dobot, conveyor=None):
+        self.audio = audio
+        self.dobot = dobot
+        self.conveyor = conveyor
+        # 語音在獨立執行緒依序播放，手臂工作執行緒不必等待上一段語音結束
+        self._speech = queue.Queue(maxsize=DOBOT_JOB_QUEUE_SIZE)
+        self._speech_thread = threading.Thread(target=self._speech_loop, name='speech', daemon=True)
+        self._speech_thread.start()
+
+    def _speech_loop(self):
+        """依序播放語音，每段開始前先等上一段結束，避免被截斷"""
+        while True:
+            sound_id = self._speech.get()
+            self._finish()
+            self.audio.speak(sound_id)
+
+    def _announce(self, class_name):
+        """排入類別對應的語音（在手臂工作執行緒呼叫，不等待播放）"""
+        sound_id = sound_map.get(class_name)
+        if sound_id is not None:
+            try:
+                self._speech.put_nowait(sound_id)
+            except queue.Full:
+                print("語音佇列已滿，略過本段語音")
+                return
+            if AUDIO_LEAD_TIME > 0:
+                time.sleep(AUDIO_LEAD_TIME)
+
+    def _wait_job(self, future, timeout):
+        """等待手臂工作完成，成功回傳 True，未執行回傳 False
+
+        逾時且工作已開始執行（無法取消）時回傳 None，表示手臂可能仍在處理該物件。
+        """
+        try:
+            future.result(timeout=timeout)
+            return True
+        except CancelledError:
+            print("手臂工作已過期或被取消")
+        except TimeoutError:
+            if not future.cancel():
+                print(f"手臂工作超過 {timeout} 秒仍未完成，結果不明")
+                return None
+            print(f"手臂工作超過 {timeout} 秒仍未開始，已取消")
+        except Exception as e:
+            print(f"手臂工作失敗: {e}")
+        return False
+
+    def _finish(self):
+        """等待語音播放結束，確保下一個物件的語音不會被截斷"""
+        if not self.audio.wait_until_done(AUDIO_DONE_TIMEOUT):
+            print("語音播放等待逾時")
+
+    def _submit_pick(self, obj, timestamp, return_home):
+        """送出夾取工作，語音在手臂實際開始處理該物件時播放；無法夾取時回傳 None"""
+        cX, cY = obj['center']
+        velocity = None
+        if PICK_ON_THE_MOVE:
+            velocity = self.conveyor.velocity() if self.conveyor is not None else None
+            if velocity is None:
+                print("輸送帶速度尚未估計完成，略過夾取")
+                return None
+        return self.dobot.submit_pick(cX, cY, obj['class'], 8, timestamp, velocity, return_home,
+                                      on_start=lambda: self._announce(obj['class']))
+
+    def _wait_pick(self, future):
+        if future is None:
+            return False
+        done = self._wait_job(future, PICK_DONE_TIMEOUT)
+        self._finish()
+        return done
+
+    def pick(self, obj, timestamp, return_home=True):
+        """語音提示後夾取物件，等待手臂完成與語音結束"""
+        return self._wait_pick(self._submit_pick(obj, timestamp, return_home))
+
+    def pick_batch(self, objects, timestamp, return_home=True):
+        """依序夾取多個物件，先送出後面的工作讓手臂不必等待，回傳每個物件的結果（同 _wait_job）
+
+        同時未完成的工作數不超過手臂工作佇列長度。
+        """
+        results = [False] * len(objects)
+        pending = deque()
+        for i, obj in enumerate(objects):
+            if len(pending) >= DOBOT_JOB_QUEUE_SIZE:
+                j, future = pending.popleft()
+                results[j] = self._wait_pick(future)
+            pending.append((i, self._submit_pick(obj, timestamp, return_home)))
+        while pending:
+            j, future = pending.popleft()
+            results[j] = self._wait_pick(future)
+        return results
+
+    def return_home(self):
+        """手臂回到待命位置並等待完成"""
+        return self._wait_job(self.dobot.submit_return_home(), PICK_DONE_TIMEOUT)
+
+    def set_conveyor(self, running):
+        """邊走邊夾模式下啟動或停止連續運轉的輸送帶"""
+        if PICK_ON_THE_MOVE:
+            self._wait_job(self.dobot.submit_conveyor_state(running), CONVEYOR_DONE_TIMEOUT)
+            # 啟動或停止前後的速度不同，重新估計
+            if self.conveyor is not None:
+                self.conveyor.reset()
+
+    def reject(self, obj, timestamp):
+        """語音提示後運行輸送帶送走物件，等待輸送帶停止與語音結束"""
+        future = self.dobot.submit_conveyor(timestamp, on_start=lambda: self._announce(obj['class']))
+        done = self._wait_job(future, CONVEYOR_DONE_TIMEOUT)
+        self._finish()
+        return done
@@ -0,0 +1,150 @@
+import time
+import statistics
+import threading
+from collections import OrderedDict, deque
+import cv2
+from config import STREAM_ADAPTIVE, STREAM_TARGET_DELAY, STREAM_BANDWIDTH_BUDGET, STREAM_QUALITY_RANGE
+from config import STREAM_QUALITY_STEP, STREAM_SCALES, STREAM_FPS_RANGE, STREAM_ADJUST_INTERVAL, STREAM_CLIENT_TIMEOUT
+
+class ClientState:
+    """單一前端的確認紀錄"""
+
+    def __init__(self, now):
+        self.last_ack_seq = None
+        self.last_ack_time = now
+        self.delay = None  # 擷取到顯示完成的延遲（秒，指數平均）
+        self.acks = 0
+
+class StreamController:
+    """依各前端的影像確認調整 JPEG 品質、縮放比例與影格率
+
+    延遲以擷取時間到收到前端確認的時間計算（都在伺服器端計時，不需要校時）；
+    尚未確認的影像也計入，前端停住時延遲會持續上升。編碼結果由所有前端共用，
+    以各前端延遲的（下）中位數與送出頻寬決定設定，少數慢的前端只會被分送端跳過影像，
+    不會拉低其他前端的畫質：超過目標先降品質、再縮小、最後降影格率；
+    明顯低於目標時依相反順序恢復。頻寬上限是唯一對所有前端生效的限制。
+    """
+
+    def __init__(self, adaptive=STREAM_ADAPTIVE, target_delay=STREAM_TARGET_DELAY, budget=STREAM_BANDWIDTH_BUDGET):
+        self.adaptive = adaptive
+        self.target_delay = target_delay
+        self.budget = budget
+        self.quality = STREAM_QUALITY_RANGE[1]
+        self.scale_index = 0
+        self.fps = STREAM_FPS_RANGE[1]
+        self.clients = {}
+        self._sent = OrderedDict()  # seq -> 擷取時間
+        self._bytes = deque()       # (送出時間, 位元組數)
+        self._last_send = 0.0
+        self._last_adjust = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def scale(self):
+        return STREAM_SCALES[self.scale_index]
+
+    def should_send(self, now=None):
+        """依目前影格率決定這一張是否要送出"""
+        now = time.time() if now is None else now
+        return now - self._last_send >= 1.0 / self.fps - 1e-3
+
+    def encode(self, frame):
+        """以目前的品質與縮放比例編碼 JPEG"""
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes()
+
+    def on_sent(self, seq, size, capture_time, now=None):
+        """記錄送出的影像"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_send = now
+            self._sent[seq] = capture_time
+            while len(self._sent) > 256:
+                self._sent.popitem(last=False)
+            self._bytes.append((now, size))
+        self._adjust(now)
+
+    def on_ack(self, client, seq, now=None):
+        """前端顯示完成一張影像"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self.clients.get(client)
+            if state is None:
+                state = self.clients[client] = ClientState(now)
+            state.last_ack_time = now
+            state.acks += 1
+            if seq in self._sent and (state.last_ack_seq is None or seq > state.last_ack_seq):
+                state.last_ack_seq = seq
+                delay = now - self._sent[seq]
+                state.delay = delay if state.delay is None else 0.7 * state.delay + 0.3 * delay
+
+    def remove(self, client):
+        """前端離線"""
+        with self._lock:
+            self.clients.pop(client, None)
+
+    def _client_delay(self, state, now):
+        """前端目前的延遲：確認延遲與最舊一張未確認影像的等待時間取大者"""
+        delay = state.delay or 0.0
+        for seq, capture_time in self._sent.items():
+            if state.last_ack_seq is None or seq > state.last_ack_seq:
+                return max(delay, now - capture_time)
+        return delay
+
+    def _bandwidth(self, now, window=2.0):
+        """最近 window 秒的送出頻寬（bit/s）"""
+        while self._bytes and now - self._bytes[0][0] > window:
+            self._bytes.popleft()
+        return sum(size for _, size in self._bytes) * 8 / window
+
+    def _adjust(self, now):
+        if not self.adaptive or now - self._last_adjust < STREAM_ADJUST_INTERVAL:
+            return
+        with self._lock:
+            for client in [c for c, s in self.clients.items() if now - s.last_ack_time > STREAM_CLIENT_TIMEOUT]:
+                del self.clients[client]
+            if not self.clients:
+                return
+            delay = statistics.median_low(self._client_delay(state, now) for state in self.clients.values())
+            bandwidth = self._bandwidth(now)
+        self._last_adjust = now
+        if delay > self.target_delay or bandwidth > self.budget:
+            self._degrade()
+        elif delay < self.target_delay * 0.5 and bandwidth < self.budget * 0.7:
+            self._improve()
+
+    def _degrade(self):
+        low, _ = STREAM_QUALITY_RANGE
+        if self.quality > low:
+            self.quality = max(low, self.quality - STREAM_QUALITY_STEP)
+        elif self.scale_index < len(STREAM_SCALES) - 1:
+            self.scale_index += 1
+        else:
+            self.fps = max(STREAM_FPS_RANGE[0], self.fps // 2)
+
+    def _improve(self):
+        _, high = STREAM_QUALITY_RANGE
+        if self.fps < STREAM_FPS_RANGE[1]:
+            self.fps = min(STREAM_FPS_RANGE[1], self.fps * 2)
+        elif self.scale_index > 0:
+            self.scale_index -= 1
+        elif self.quality < high:
+            self.quality = min(high, self.quality + STREAM_QUALITY_STEP)
+
+    def stats(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            clients = {
+                client: {'delay_ms': round(self._client_delay(state, now) * 1000, 1), 'acks': state.acks}
+                for client, state in self.clients.items()
+            }
+            bandwidth = self._bandwidth(now)
+        return {
+            'quality': self.quality,
+            'scale': self.scale,
+            'fps': self.fps,
+            'bandwidth_kbps': round(bandwidth / 1000, 1),
+            'clients': clients,
+        }
@@ -0,0 +1,67 @@
+import threading
+from config import TRACK_STATE_TIMEOUT
+
+# 追蹤物件狀態
+SEEN = 'seen'          # 已看到，尚未處理
+QUEUED = 'queued'      # 已排入手臂工作
+PICKED = 'picked'      # 已夾取完成
+REJECTED = 'rejected'  # 已判定不良並送走
+FAILED = 'failed'      # 工作逾時且結果不明，不再重試
+
+class TrackRegistry:
+    """以追蹤編號記錄每個實體物件的處理狀態，確保每個物件只處理一次"""
+
+    def __init__(self, timeout=TRACK_STATE_TIMEOUT):
+        self.timeout = timeout
+        self._tracks = {}  # track_id -> {'state', 'class', 'last_seen'}
+        self._lock = threading.Lock()
+
+    def observe(self, objects, timestamp):
+        """記錄本張影像看到的追蹤編號，並清除過久未出現的編號"""
+        with self._lock:
+            for obj in objects:
+                track_id = obj.get('track_id')
+                if track_id is None:
+                    continue
+                track = self._tracks.setdefault(track_id, {'state': SEEN, 'class': obj['class']})
+                track['last_seen'] = timestamp
+                if track['state'] == SEEN:
+                    track['class'] = obj['class']
+            for track_id in [k for k, v in self._tracks.items() if timestamp - v['last_seen'] > self.timeout]:
+                del self._tracks[track_id]
+
+    def claim(self, track_id):
+        """將 SEEN 狀態的物件標記為 QUEUED，成功回傳 True；已處理過的物件回傳 False"""
+        with self._lock:
+            track = self._tracks.get(track_id)
+            if track is None or track['state'] != SEEN:
+                return False
+            track['state'] = QUEUED
+            return True
+
+    def mark(self, track_id, state):
+        """更新物件狀態"""
+        with self._lock:
+            if track_id in self._tracks:
+                self._tracks[track_id]['state'] = state
+
+    def release(self, track_id):
+        """工作未執行（過期或取消）時退回 SEEN，讓較新的檢測重新處理"""
+        self.mark(track_id, SEEN)
+
+    def state(self, track_id):
+        with self._lock:
+            track = self._tracks.get(track_id)
+            return track['state'] if track is not None else None
+
+    def summary(self):
+        """各狀態的物件數量"""
+        with self._lock:
+            result = {SEEN: 0, QUEUED: 0, PICKED: 0, REJECTED: 0, FAILED: 0}
+            for track in self._tracks.values():
+                result[track['state']] += 1
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._tracks.clear()
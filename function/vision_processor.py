@@ -1,117 +1,294 @@
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from config import Video_num, kernel, color_map
+from config import CAMERAS, CAMERA_PROFILE, MOTION_GATE, KEYFRAME_MODE, EXPOSURE_NORMALIZE, DETECTOR_IMGSZ, RUNTIME_CONFIG_FILE
+from config import UNKNOWN_MIN_AREA, UNKNOWN_MARGIN, UNKNOWN_MATCH_IOU, UNKNOWN_LOOP_MAX_PAIRS
+from function.detector_engine import create_engine, IouTracker
+from function.detection_metrics import unknown_indices
+from function.motion_gate import MotionGate
+from function.keyframe_tracker import KeyframeTracker
+from function.camera_grabber import FrameGrabber, open_capture
+from function.segmentation import Segmenter
+from function.exposure import ExposureNormalizer, gamma_lut
+from function.runtime_config import load_runtime_config
+
+def load_mask_roi(path="mask.png"):
+    """載入遮罩並計算非零區域，回傳 (遮罩, ROI (x, y, w, h), ROI 遮罩, 模型輸入尺寸 (h, w))
+
+    無法載入或全黑時 ROI 與 ROI 遮罩為 None，輸入尺寸為 (640, 640)。
+    """
+    img_mask = cv2.imread(path)
+    if img_mask is None:
+        print(f"無法載入 {path}，檢查文件是否存在")
+        return None, None, None, (640, 640)
+    points = cv2.findNonZero(cv2.cvtColor(img_mask, cv2.COLOR_BGR2GRAY))
+    if points is None:
+        print("遮罩全黑，不使用 ROI 裁切")
+        return img_mask, None, None, (640, 640)
+    x, y, w, h = cv2.boundingRect(points)
+    roi_mask = np.ascontiguousarray(img_mask[y:y + h, x:x + w])
+    # 輸入尺寸取 ROI 的大小（32 的倍數），維持與整張影像推論時相同的物件比例
+    input_shape = (int(np.ceil(h / 32) * 32), int(np.ceil(w / 32) * 32))
+    full = img_mask.shape[0] * img_mask.shape[1]
+    print(f"遮罩 ROI: x={x} y={y} w={w} h={h}，處理像素為整張的 {w * h / full:.0%}")
+    return img_mask, (x, y, w, h), roi_mask, input_shape
+
+def scale_input_shape(input_shape, imgsz, train_size=640):
+    """依推論解析度縮放模型輸入尺寸 (h, w)，imgsz 等於訓練尺寸時不縮放，結果為 32 的倍數"""
+    scale = imgsz / train_size
+    return tuple(max(32, int(round(side * scale / 32)) * 32) for side in input_shape)
+
+def crop_roi(image, roi, roi_mask):
+    """裁切 ROI 並套用遮罩，回傳 (遮罩後影像, 左上角座標)"""
+    if roi is None:
+        return image, (0, 0)
+    x0, y0, w, h = roi
+    return cv2.bitwise_and(image[y0:y0 + h, x0:x0 + w], roi_mask), (x0, y0)
+
+class CameraView:
+    """單一攝影機的擷取執行緒、遮罩 ROI 與逐影格狀態（動態閘門、關鍵影格、追蹤）"""
+
+    def __init__(self, name, source, mask="mask.png", profile=None, imgsz=DETECTOR_IMGSZ):
+        self.name = name
+        self.capture = open_capture(source, dict(CAMERA_PROFILE, **(profile or {})))
+        self.grabber = FrameGrabber(self.capture)
+        self.grabber.start()
+        self.img_mask, self.roi, self.roi_mask, self.input_shape = load_mask_roi(mask)
+        self.input_shape = scale_input_shape(self.input_shape, imgsz)
+        self.segmenter = Segmenter(self.roi, self.roi_mask)
+        self.exposure = ExposureNormalizer(self.roi_mask if self.roi_mask is not None else self.img_mask) if EXPOSURE_NORMALIZE else None
+        self._exposed = None  # 曝光校正後的模型輸入緩衝區
+        self.motion_gate = MotionGate(self.roi_mask if self.roi_mask is not None else self.img_mask) if MOTION_GATE else None
+        self.keyframe_tracker = KeyframeTracker(self.roi[:2] if self.roi is not None else (0, 0)) if KEYFRAME_MODE else None
+        self.tracker = IouTracker()  # 批次推論時每台攝影機各自追蹤
+        self.unknown_tracker = IouTracker(prefix='u')  # 未知物件的追蹤編號，讓每個異物只處理一次
+        self.last_source = 'detector'  # detector / propagated / reused
+        self._last_model_objects = []
+        self._last_unknown_objects = []
+
+    def read_latest(self, timeout=1.0):
+        """取得最新的攝影機影像 (frame, 擷取時間, 序號)，失敗或 timeout 內沒有新影像回傳 None"""
+        latest = self.grabber.latest(timeout)
+        if latest is None:
+            if self.grabber.failed:
+                print(f"攝影機 {self.name} 讀取失敗")
+            return None
+        seq, timestamp, frame = latest
+        return frame, timestamp, seq
+
+    def begin(self, cap_input):
+        """推論前的處理：可沿用或推移上一次結果時回傳 (完成結果, None)，否則回傳 (None, 待推論狀態)"""
+        # 只處理遮罩非零區域，座標最後再平移回整張影像
+        cap_mask, offset = self.segmenter.crop(cap_input)
+
+        # 場景靜止時沿用上一次的檢測結果
+        if self.motion_gate is not None and not self.motion_gate.should_run(cap_mask):
+            self.last_source = 'reused'
+            if self.keyframe_tracker is not None:
+                # 靜止期間沒有更新光流的前一張影像，恢復變化時直接重新檢測
+                self.keyframe_tracker.request_keyframe()
+            return (cap_input, list(self._last_model_objects), list(self._last_unknown_objects)), None
+
+        # 關鍵影格模式：非關鍵影格以光流推移上一次的檢測框
+        gray = None
+        if self.keyframe_tracker is not None:
+            gray = cv2.cvtColor(cap_mask, cv2.COLOR_BGR2GRAY)
+            if not self.keyframe_tracker.keyframe_due():
+                self.last_source = 'propagated'
+                objects = self.keyframe_tracker.propagate(gray)
+                model_detected_objects = [obj for obj in objects if obj['class'] != 'unknown']
+                unknown_detected_objects = [obj for obj in objects if obj['class'] == 'unknown']
+                self._last_model_objects = list(model_detected_objects)
+                self._last_unknown_objects = list(unknown_detected_objects)
+                return (cap_input, model_detected_objects, unknown_detected_objects), None
+        self.last_source = 'detector'
+        start = time.time()
+
+        # 分割非黑色區域並找出contours
+        mask_non_black = self.segmenter.segment(cap_mask)
+
+        contours, _ = cv2.findContours(mask_non_black, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+
+        # 曝光校正只用於模型輸入：分割門檻是以未校正的亮度設定的，校正後黑色輸送帶會被視為前景
+        model_input = cap_mask
+        if self.exposure is not None:
+            if self._exposed is None or self._exposed.shape != cap_mask.shape:
+                self._exposed = np.empty_like(cap_mask)
+            model_input = self.exposure.apply(cap_mask, dst=self._exposed)
+        return None, {'frame': cap_input, 'crop': model_input, 'offset': offset, 'gray': gray, 'contours': contours, 'start': start}
+
+    def complete(self, state, detections):
+        """以推論結果（裁切影像座標）完成檢測，回傳 (影像, 已知物件, 未知物件)"""
+        cap_input = state['frame']
+        x0, y0 = state['offset']
 
-class VisionProcessor:
-    def __init__(self):
-        self.model = YOLO("./Cube_Color_4_and_Defect_Model/V12_4_Color_Training12/weights/best.pt")
-        self.capture = cv2.VideoCapture(Video_num)
-        self.img_mask = None
-        self._load_mask()
-    
-    def _load_mask(self):
-        """載入遮罩圖片"""
-        self.img_mask = cv2.imread("mask.png")
-        if self.img_mask is None:
-            print("無法載入 mask2.png，檢查文件是否存在")
-    
-    def adjust_gamma(self, image, gamma=1.0):
-        """調整影像伽馬值"""
-        invGamma = 1.0 / gamma
-        table = np.array([((i / 255.0) ** invGamma) * 255 for i in np.arange(0, 256)]).astype("uint8")
-        return cv2.LUT(image, table)
-    
-    def process_frame(self):
-        """處理單張影像並回傳檢測結果"""
-        ret, cap_input = self.capture.read()
-        if not ret:
-            print("攝影機讀取失敗")
-            return None, [], []
-        
-        print("原始影像尺寸:", cap_input.shape)
-        
-        # 應用遮罩
-        if self.img_mask is not None:
-            cap_mask = cv2.bitwise_and(cap_input, self.img_mask)
-        else:
-            cap_mask = cap_input.copy()
-        
-        print("遮罩後影像尺寸:", cap_mask.shape)
-        
-        # 處理HSV並找出contours
-        hsv = cv2.cvtColor(cap_mask, cv2.COLOR_BGR2HSV)
-        lower_black = np.array([0, 0, 99])
-        upper_black = np.array([255, 255, 255])
-        mask_black = cv2.inRange(hsv, lower_black, upper_black)
-        mask_non_black = cv2.morphologyEx(mask_black, cv2.MORPH_OPEN, kernel)
-        
-        contours, _ = cv2.findContours(mask_non_black, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
         # YOLO模型檢測
-        results = self.model.track(cap_mask, persist=True, stream=True, conf=0.7)
         model_detected_objects = []
         unknown_detected_objects = []
-        
-        # 處理YOLO檢測結果
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                class_name = r.names[int(box.cls[0])].lower()
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-                model_detected_objects.append({
-                    'class': class_name,
-                    'bbox': (x1, y1, x2, y2),
-                    'confidence': conf,
-                    'center': ((x1 + x2) // 2, (y1 + y2) // 2)
-                })
-        
+        for obj in detections:
+            x1, y1, x2, y2 = obj['bbox']
+            x1, y1, x2, y2 = x1 + x0, y1 + y0, x2 + x0, y2 + y0
+            model_detected_objects.append({
+                'class': obj['class'],
+                'bbox': (x1, y1, x2, y2),
+                'confidence': obj['confidence'],
+                'center': ((x1 + x2) // 2, (y1 + y2) // 2),
+                'track_id': obj.get('track_id')
+            })
+
         # 處理未知物件（contours中未被YOLO檢測到的）
-        for contour in contours:
-            if cv2.contourArea(contour) < 500:
+        blobs = []
+        for contour in state['contours']:
+            if cv2.contourArea(contour) < UNKNOWN_MIN_AREA:
                 continue
             edge = cv2.arcLength(contour, True)
             vertices = cv2.approxPolyDP(contour, edge * 0.04, True)
             x, y, w, h = cv2.boundingRect(vertices)
-            x1, y1, x2, y2 = x, y, x + w, y + h
-
-            is_known = False
-            for obj in model_detected_objects:
-                if (x1 >= obj['bbox'][0] - 20 and x2 <= obj['bbox'][2] + 20 and
-                        y1 >= obj['bbox'][1] - 20 and y2 <= obj['bbox'][3] + 20):
-                    is_known = True
-                    break
+            blobs.append((x, y, x + w, y + h))
 
-            if not is_known:
+        # 一次計算所有輪廓 × 檢測框的包含關係
+        if blobs:
+            boxes = [obj['bbox'] for obj in model_detected_objects]
+            for i in unknown_indices(blobs, boxes, UNKNOWN_MARGIN, UNKNOWN_MATCH_IOU, UNKNOWN_LOOP_MAX_PAIRS):
+                x1, y1, x2, y2 = blobs[i]
                 unknown_detected_objects.append({
                     'class': 'unknown',
                     'bbox': (x1, y1, x2, y2),
                     'center': ((x1 + x2) // 2, (y1 + y2) // 2)
                 })
-        
-        # 在影像上繪製檢測框
-        self._draw_detections(cap_input, model_detected_objects, unknown_detected_objects)
-        
+
+        self.unknown_tracker.update(unknown_detected_objects)
+
+        if self.motion_gate is not None:
+            self.motion_gate.record_inference(time.time() - state['start'])
+        self._last_model_objects = list(model_detected_objects)
+        self._last_unknown_objects = list(unknown_detected_objects)
+        if self.keyframe_tracker is not None:
+            self.keyframe_tracker.keyframe(state['gray'], model_detected_objects + unknown_detected_objects)
+
         return cap_input, model_detected_objects, unknown_detected_objects
+
+    def request_keyframe(self):
+        """要求下一張影像執行完整檢測（關鍵影格模式）"""
+        if self.keyframe_tracker is not None:
+            self.keyframe_tracker.request_keyframe()
+
+    def stats(self):
+        stats = {'camera': self.grabber.stats()}
+        if self.motion_gate is not None:
+            stats['motion_gate'] = self.motion_gate.stats()
+        if self.keyframe_tracker is not None:
+            stats['keyframe'] = self.keyframe_tracker.stats()
+        if self.exposure is not None:
+            stats['exposure'] = self.exposure.stats()
+        return stats
+
+    def release(self):
+        """釋放攝影機資源"""
+        self.grabber.stop()
+        if self.capture:
+            self.capture.release()
+
+class VisionProcessor:
+    """管理所有攝影機，每次推論把各攝影機的影像合併成一次批次呼叫
+
+    第一台攝影機為主攝影機，夾取流程使用它的結果；單一攝影機時直接使用推論引擎的追蹤器。
+    """
+
+    def __init__(self, cameras=CAMERAS):
+        imgsz = load_runtime_config(RUNTIME_CONFIG_FILE).get('imgsz', DETECTOR_IMGSZ)
+        self.views = [CameraView(imgsz=imgsz, **camera) for camera in cameras]
+        self.batched = len(self.views) > 1
+        if self.batched:
+            # 批次輸入需要相同尺寸，取各攝影機輸入尺寸的最大值
+            shape = tuple(max(view.input_shape[i] for view in self.views) for i in range(2))
+            self.engine = create_engine(shape, batch=len(self.views))
+        else:
+            shape = self.views[0].input_shape
+            self.engine = create_engine(shape)
+        print(f"推論解析度 {imgsz}，攝影機 {len(self.views)} 台，模型輸入 {shape[0]}x{shape[1]}")
+
+    @property
+    def primary(self):
+        return self.views[0]
+
+    @property
+    def grabber(self):
+        return self.primary.grabber
+
+    @property
+    def last_source(self):
+        return self.primary.last_source
     
-    def _draw_detections(self, image, model_objects, unknown_objects):
-        """在影像上繪製檢測框"""
-        # 繪製YOLO檢測到的物件
-        for obj in model_objects:
-            x1, y1, x2, y2 = obj['bbox']
-            box_color = color_map.get(obj['class'], (255, 255, 255))
-            label = f"{obj['class']}"
-            cv2.rectangle(image, (x1, y1), (x2, y2), box_color, 2)
-            cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-        
-        # 繪製未知物件
-        for obj in unknown_objects:
-            x1, y1, x2, y2 = obj['bbox']
-            cv2.rectangle(image, (x1, y1), (x2, y2), (255, 255, 255), 2)
-            cv2.putText(image, obj['class'], (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    def adjust_gamma(self, image, gamma=1.0):
+        """調整影像伽馬值"""
+        return cv2.LUT(image, gamma_lut(gamma))
+    
+    def read_latest(self):
+        """取得主攝影機最新的影像 (frame, 擷取時間, 序號)，失敗回傳 None"""
+        return self.primary.read_latest()
+
+    def read_all(self):
+        """取得每台攝影機最新的影像，順序與 views 相同，失敗或沒有新影像的項目為 None
+
+        只等待主攝影機的新影像；其他攝影機不等待，沒有新影像時本次略過，
+        主攝影機的處理速度不受較慢的攝影機影響。
+        """
+        return [self.primary.read_latest()] + [view.read_latest(timeout=0) for view in self.views[1:]]
+    
+    def read_frame(self):
+        """讀取一張攝影機影像，失敗回傳 None"""
+        latest = self.read_latest()
+        return latest[0] if latest is not None else None
+    
+    def process_frame(self):
+        """處理單張影像並回傳檢測結果"""
+        cap_input = self.read_frame()
+        if cap_input is None:
+            return None, [], []
+        return self.detect(cap_input)
+    
+    def detect(self, cap_input):
+        """對主攝影機已讀取的影像執行檢測並回傳結果"""
+        return self.detect_batch([cap_input] + [None] * (len(self.views) - 1))[0]
+
+    def detect_batch(self, frames):
+        """對各攝影機的影像（順序與 views 相同，None 表示略過）執行一次批次檢測
+
+        回傳每台攝影機的 (影像, 已知物件, 未知物件)，略過的攝影機為 None。
+        """
+        results = [None] * len(self.views)
+        pending = []
+        for i, (view, frame) in enumerate(zip(self.views, frames)):
+            if frame is None:
+                continue
+            result, state = view.begin(frame)
+            if state is None:
+                results[i] = result
+            else:
+                pending.append((i, state))
+        if not pending:
+            return results
+
+        if self.batched:
+            batch = self.engine.predict_batch([state['crop'] for _, state in pending])
+            detections = [self.views[i].tracker.update(objects) for (i, _), objects in zip(pending, batch)]
+        else:
+            detections = [self.engine.detect(pending[0][1]['crop'])]
+        for (i, state), objects in zip(pending, detections):
+            results[i] = self.views[i].complete(state, objects)
+        return results
+    
+    def request_keyframe(self):
+        """要求下一張影像執行完整檢測（關鍵影格模式）"""
+        for view in self.views:
+            view.request_keyframe()
+
+    def stats(self):
+        """各攝影機的擷取、動態閘門與關鍵影格統計"""
+        return {view.name: view.stats() for view in self.views}
     
     def release(self):
         """釋放攝影機資源"""
-        if self.capture:
-            self.capture.release()
\ No newline at end of file
+        for view in self.views:
+            view.release()
@@ -1,15 +1,26 @@
 import cv2
-import base64
 import time
 import threading
 import signal
-from flask import Flask
+from flask import Flask, Response, request, abort
 from flask_socketio import SocketIO
 
 from function.dobot_controller import DobotController
 from function.vision_processor import VisionProcessor
 from function.audio_controller import AudioController
 from function.object_counter import ObjectCounter
+from function.sequencer import ActionSequencer
+from function.conveyor_model import ConveyorModel
+from function.track_registry import TrackRegistry, SEEN, PICKED, REJECTED, FAILED
+from function.pipeline import LatestQueue, Pipeline, PipelineStage
+from function.pick_planner import plan_pick_order, next_pick
+from function.overlay import draw_detections, detections_payload
+from function.frame_buffer import FrameBuffer
+from function.stream_controller import StreamController
+from function.frame_fanout import FrameFanout
+from config import PIPELINE_QUEUE_SIZE, PIPELINE_STATS_INTERVAL
+from config import BIN_POSITIONS, DOBOT_HOME, PICK_RETURN_HOME_EACH, PICK_ON_THE_MOVE
+from config import SERVER_SIDE_OVERLAY, LOCAL_PREVIEW
 
 app = Flask(__name__)
 socketio = SocketIO(app)
@@ -19,92 +30,212 @@ dobot = DobotController()
 vision = VisionProcessor()
 audio = AudioController()
 counter = ObjectCounter(socketio)
+conveyor = ConveyorModel()
+sequencer = ActionSequencer(audio, dobot, conveyor)
+tracks = TrackRegistry()
+# 各攝影機最新的已編碼 JPEG，Socket.IO 與 HTTP 串流共用
+frame_buffers = {view.name: FrameBuffer() for view in vision.views}
+stream_control = StreamController()
+# 每張影像只編碼一次，依各訂閱者的確認分送（慢的訂閱者只收到最新一張）
+# 其他攝影機只經由 /stream.mjpg?camera=名稱 與 /snapshot.jpg?camera=名稱 提供
+fanout = FrameFanout(socketio.emit, 'frame')
 
 # 控制變數
 running = True
 flag_start_work = False
 color_state = "None"
 state = "None"
+pipeline = None
+actuator_queue = None
+
+def capture_stage():
+    """擷取階段：取得每台攝影機背景擷取的最新影像"""
+    latest = vision.read_all()
+    if latest[0] is None:
+        if running and vision.grabber.failed:
+            print("攝影機讀取失敗，退出主迴圈")
+            threading.Thread(target=cleanup, daemon=True).start()
+        return None
+    frame, timestamp, seq = latest[0]
+    return {'frame': frame, 'timestamp': timestamp, 'seq': seq,
+            'frames': [item[0] if item is not None else None for item in latest]}
+
+def inference_stage(packet):
+    """推論階段：所有攝影機一次批次檢測，主攝影機結果分送給串流與手臂階段"""
+    results = vision.detect_batch(packet.pop('frames'))
+    frame, model_objects, unknown_objects = results[0]
+    # 其他攝影機只做檢測與顯示
+    packet['cameras'] = [
+        {'name': view.name, 'frame': result[0], 'model_objects': result[1], 'unknown_objects': result[2]}
+        for view, result in zip(vision.views[1:], results[1:]) if result is not None
+    ]
+    packet['model_objects'] = model_objects
+    packet['unknown_objects'] = unknown_objects
+    packet['source'] = vision.last_source
+    if packet['source'] != 'reused':
+        conveyor.update(model_objects, packet['timestamp'])
+    tracks.observe(model_objects + unknown_objects, packet['timestamp'])
+    if flag_start_work:
+        actuator_queue.put(packet)
+    return packet
+
+def encode_frame(frame, model_objects, unknown_objects, name, send=True):
+    """編碼串流影像（品質與縮放由 stream_control 決定）；檢測框預設由前端繪製，原始影像不會被修改"""
+    annotated = None
+    if SERVER_SIDE_OVERLAY or LOCAL_PREVIEW:
+        annotated = draw_detections(frame.copy(), model_objects, unknown_objects)
+    if LOCAL_PREVIEW:
+        cv2.imshow(name, annotated)
+    if not send:
+        return None
+    # bytes 會以 Socket.IO 二進位附件傳送，不需 base64 編碼
+    return stream_control.encode(annotated if SERVER_SIDE_OVERLAY else frame)
+
+def stream_stage(packet):
+    """串流階段：傳送檢測資料與影像到前端"""
+    frame = packet['frame']
+    # 依前端確認的延遲與頻寬限制影格率，這一張不送時只更新本機預覽
+    if not stream_control.should_send():
+        encode_frame(frame, packet['model_objects'], packet['unknown_objects'], "camera_input", send=False)
+        return None
+    jpg = encode_frame(frame, packet['model_objects'], packet['unknown_objects'], "camera_input")
+    frame_buffers[vision.primary.name].publish(jpg, packet['seq'])
+    stream_control.on_sent(packet['seq'], len(jpg), packet['timestamp'])
+    # 檢測資料與影像放在同一則訊息，跳過影像時檢測資料也一起跳過，前端依此繪製檢測框
+    fanout.publish({
+        'frame': jpg,
+        'seq': packet['seq'],
+        'detections': detections_payload(packet['seq'], frame.shape, packet['model_objects'], packet['unknown_objects']),
+        # 影像已含伺服器繪製的檢測框，前端不必再畫
+        'overlay_drawn': SERVER_SIDE_OVERLAY
+    })
+    for camera in packet['cameras']:
+        camera_jpg = encode_frame(camera['frame'], camera['model_objects'], camera['unknown_objects'], f"camera_{camera['name']}")
+        frame_buffers[camera['name']].publish(camera_jpg, packet['seq'])
+    return None
+
+def finish_track(obj, done, state):
+    """依工作結果更新追蹤狀態，未執行的工作退回讓之後的檢測重試
+
+    done 為 None 表示工作逾時但可能仍在執行，標記為失敗，避免同一物件被處理兩次。
+    """
+    track_id = obj.get('track_id')
+    if track_id is None:
+        return
+    if done:
+        tracks.mark(track_id, state)
+    elif done is None:
+        tracks.mark(track_id, FAILED)
+    else:
+        tracks.release(track_id)
+
+def actuator_stage(packet):
+    """手臂階段：依檢測結果執行夾取與輸送帶動作"""
+    if not flag_start_work:
+        return None
+
+    model_objects = packet['model_objects']
+    # 串流階段同時讀取同一份列表，排序本地複本，不就地修改
+    unknown_objects = sorted(packet['unknown_objects'], key=lambda x: x['center'][0])
+    # 篩選尚未處理的已知物件（同一追蹤編號只處理一次）
+    # 追蹤器尚未確認的物件沒有編號，下一張影像取得編號後才處理，避免同一物件計數與夾取兩次
+    candidates = []
+    rejects = []
+    for obj in model_objects:
+        class_name = obj['class']
+        track_id = obj.get('track_id')
+        if track_id is None:
+            continue
+        if class_name in BIN_POSITIONS:
+            if tracks.state(track_id) == SEEN:
+                candidates.append(obj)
+        elif tracks.claim(track_id):
+            counter.update_counts(class_name, track_id)
+            if class_name == 'broken':
+                rejects.append(obj)
+
+    # 依手臂位置與放置點規劃夾取順序
+    points = dobot.pixels_to_robot([obj['center'] for obj in candidates]) if candidates else []
+    jobs = [(point, BIN_POSITIONS[obj['class']]) for point, obj in zip(points, candidates)]
+    if not jobs:
+        order = []
+    elif PICK_ON_THE_MOVE:
+        order = plan_pick_order(dobot.pose, jobs, end=DOBOT_HOME)
+    else:
+        # 停帶夾取每個工作都會先讓輸送帶前進，之後的物件座標都會改變，
+        # 每張影像只夾一個，其餘物件由下一張影像重新檢測
+        order = [next_pick(dobot.pose, jobs, end=DOBOT_HOME)]
+    picks = []
+    for obj in (candidates[i] for i in order):
+        if tracks.claim(obj['track_id']):
+            counter.update_counts(obj['class'], obj['track_id'])
+            picks.append(obj)
+    results = sequencer.pick_batch(picks, packet['timestamp'], return_home=PICK_RETURN_HOME_EACH)
+    for obj, done in zip(picks, results):
+        finish_track(obj, done, PICKED)
+    if picks and not PICK_RETURN_HOME_EACH:
+        sequencer.return_home()
+
+    # 破損物件在夾取完成後才運行輸送帶送走，避免帶走待夾取的物件
+    for obj in rejects:
+        done = sequencer.reject(obj, packet['timestamp'])
+        finish_track(obj, done, REJECTED)
+
+    # 處理未知物件（同樣依追蹤編號只處理一次）
+    for obj in unknown_objects:
+        track_id = obj.get('track_id')
+        if track_id is None or not tracks.claim(track_id):
+            continue
+        counter.update_counts('unknown', track_id)
+        print("檢測到異物，運行輸送帶")
+        done = sequencer.reject(obj, packet['timestamp'])
+        finish_track(obj, done, REJECTED)
+    return None
+
+def stats_loop():
+    """定期回報各階段吞吐量與佇列深度"""
+    while running:
+        time.sleep(PIPELINE_STATS_INTERVAL)
+        stats = pipeline.stats()
+        stats['tracks'] = tracks.summary()
+        stats['cameras'] = vision.stats()
+        stats['stream'] = stream_control.stats()
+        stats['stream']['subscribers'] = fanout.stats()
+        print(f"管線統計: {stats}")
+        socketio.emit('pipeline_stats', stats)
+
+def build_pipeline():
+    """建立 擷取 → 推論 → 串流 / 手臂 的多階段管線"""
+    global pipeline, actuator_queue
+    inference_queue = LatestQueue(PIPELINE_QUEUE_SIZE)
+    stream_queue = LatestQueue(PIPELINE_QUEUE_SIZE)
+    actuator_queue = LatestQueue(PIPELINE_QUEUE_SIZE)
+
+    pipeline = Pipeline()
+    pipeline.add_stage(PipelineStage('capture', capture_stage, output_queue=inference_queue))
+    pipeline.add_stage(PipelineStage('inference', inference_stage, inference_queue, stream_queue))
+    pipeline.add_stage(PipelineStage('stream', stream_stage, stream_queue))
+    pipeline.add_stage(PipelineStage('actuator', actuator_stage, actuator_queue))
+    return pipeline
 
 def main_loop():
-    """主迴圈（非阻塞）"""
-    global running, flag_start_work
+    """主迴圈：啟動多階段管線（非阻塞）"""
+    global running
     print("主迴圈啟動")
-    
+
     # 初始化Dobot
     dobot.initialize()
 
-    while running:
-        # 處理影像
-        frame, model_objects, unknown_objects = vision.process_frame()
-        if frame is None:
-            print("攝影機讀取失敗，退出主迴圈")
-            break
-
-        # 傳送影像到前端
-        _, buffer = cv2.imencode('.jpg', frame)
-        jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-        print(f"傳送影像大小: {len(jpg_as_text)} 字元")
-        socketio.emit('frame', {'frame': jpg_as_text})
-
-        # 如果開始工作模式
-        if flag_start_work:
-            # 按X座標排序
-            model_objects.sort(key=lambda x: x['center'][0])
-            unknown_objects.sort(key=lambda x: x['center'][0])
-            # print("7777777777777777777777777777777777777")
-            # 處理已知物件
-            for obj in model_objects:
-                cX, cY = obj['center']
-                class_name = obj['class']
-                counter.update_counts(class_name)
-
-                if class_name == 'blue':
-                    color_state = "blue"
-                    audio.speak(11)
-                    time.sleep(1)
-                    dobot.dobot_work(cX, cY, class_name, 8)
-                elif class_name == 'yellow':
-                    color_state = "yellow"
-                    audio.speak(12)
-                    time.sleep(1)
-                    dobot.dobot_work(cX, cY, class_name, 8)
-                elif class_name == 'green':
-                    color_state = "green"
-                    audio.speak(13)
-                    time.sleep(1)
-                    dobot.dobot_work(cX, cY, class_name, 8)
-                elif class_name == 'red':
-                    color_state = "red"
-                    audio.speak(14)
-                    time.sleep(1)
-                    dobot.dobot_work(cX, cY, class_name, 8)
-                elif class_name == 'broken':
-                    audio.speak(16)
-                    time.sleep(1)
-                    dobot.run_conveyor()
-                    time.sleep(4)
-                time.sleep(1)
-
-            # 處理未知物件
-            for obj in unknown_objects:
-                counter.update_counts('unknown')
-                print("檢測到異物，運行輸送帶")
-                audio.speak(15)
-                time.sleep(1)
-                dobot.run_conveyor()
-                time.sleep(5)
-
-        cv2.imshow("camera_input", frame)
-        socketio.sleep(0.1)  # 控制 WebSocket 傳輸頻率
-
-    # 清理
-    cleanup()
+    build_pipeline()
+    pipeline.start()
+    threading.Thread(target=stats_loop, daemon=True).start()
 
 def cleanup():
     """清理函數"""
     global running
     running = False
+    if pipeline is not None:
+        pipeline.stop()
     cv2.destroyAllWindows()
     vision.release()
     dobot.disconnect()
@@ -115,6 +246,47 @@ def signal_handler(sig, frame):
     cleanup()
     exit(0)
 
+def camera_buffer():
+    """依查詢參數 camera 取得影像緩衝區，預設為主攝影機"""
+    name = request.args.get('camera', vision.primary.name)
+    if name not in frame_buffers:
+        abort(404)
+    return frame_buffers[name]
+
+@app.route('/snapshot.jpg')
+def snapshot():
+    """最新一張影像，支援 If-None-Match（影像未更新時回傳 304）"""
+    latest = camera_buffer().latest()
+    if latest is None:
+        abort(503)
+    jpg, etag, _ = latest
+    response = Response(jpg, mimetype='image/jpeg')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/stream.mjpg')
+def stream_mjpg():
+    """MJPEG 串流（multipart/x-mixed-replace），每個觀看者只收到最新的影像"""
+    buffer = camera_buffer()
+    # 帶 If-None-Match 時從下一張新影像開始送
+    etags = list(request.if_none_match)
+    etag = etags[0] if etags else None
+
+    def generate():
+        nonlocal etag
+        while running:
+            latest = buffer.wait_newer(etag, timeout=5.0)
+            if latest is None:
+                continue
+            jpg, etag, _ = latest
+            yield (b'--frame\r\nContent-Type: image/jpeg\r\n'
+                   + f'Content-Length: {len(jpg)}\r\nETag: "{etag}"\r\n\r\n'.encode() + jpg + b'\r\n')
+
+    response = Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # 接收前端控制指令
 @socketio.on('control')
 def handle_control(data):
@@ -123,21 +295,39 @@ def handle_control(data):
     print(f"收到控制指令: {command}")
     if command == 'start':
         flag_start_work = True
+        vision.request_keyframe()
+        threading.Thread(target=sequencer.set_conveyor, args=(True,), daemon=True).start()
         print("GO Work")
     elif command == 'stop':
         flag_start_work = False
+        if actuator_queue is not None:
+            actuator_queue.clear()
+        threading.Thread(target=sequencer.set_conveyor, args=(False,), daemon=True).start()
         print("Finish")
 
+@socketio.on('frame_ack')
+def on_frame_ack(data):
+    """前端顯示完成一張影像（經 server.js 轉送時帶有前端的 client 編號）"""
+    stream_control.on_ack(data.get('client', request.sid), data.get('seq'))
+
+@socketio.on('client_gone')
+def on_client_gone(data):
+    stream_control.remove(data.get('client'))
+
 @socketio.on('connect')
 def on_connect():
     print("WebSocket 客戶端已連線")
+    fanout.add(request.sid)
     global running
+    if pipeline is not None and pipeline.is_running():
+        return
     running = True
     threading.Thread(target=main_loop, daemon=True).start()
 
 @socketio.on('disconnect')
 def on_disconnect():
     print("WebSocket 客戶端已斷線")
+    fanout.remove(request.sid)
 
 if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
@@ -9,6 +9,40 @@ const io = socketIo(server);
 
 let pythonSocket = null;
 
+// 每個前端未確認的影像上限（與 config.STREAM_MAX_INFLIGHT 相同），超過時只保留最新一張
+const MAX_INFLIGHT = 1;
+const ACK_TIMEOUT_MS = 5000;
+const viewers = new Map(); // socket.id -> { socket, streams: { 事件名稱: { inflight, pending } } }
+
+function sendFrame(viewer, event, payload) {
+    const stream = viewer.streams[event];
+    stream.inflight++;
+    viewer.socket.timeout(ACK_TIMEOUT_MS).emit(event, payload, (err) => {
+        stream.inflight--;
+        // 前端顯示完成，轉給 Python 端調整串流品質
+        if (!err && event === 'frame' && pythonSocket && pythonSocket.connected) {
+            pythonSocket.emit('frame_ack', { client: viewer.socket.id, seq: payload.seq });
+        }
+        if (stream.pending && viewers.has(viewer.socket.id) && stream.inflight < MAX_INFLIGHT) {
+            const next = stream.pending;
+            stream.pending = null;
+            sendFrame(viewer, event, next);
+        }
+    });
+}
+
+// 同一份影像分送給所有前端；還沒確認上一張的前端只保留最新一張，中間的影像直接跳過
+function fanOut(event, payload) {
+    for (const viewer of viewers.values()) {
+        if (!viewer.streams[event]) viewer.streams[event] = { inflight: 0, pending: null };
+        if (viewer.streams[event].inflight < MAX_INFLIGHT) {
+            sendFrame(viewer, event, payload);
+        } else {
+            viewer.streams[event].pending = payload;
+        }
+    }
+}
+
 function connectPythonSocket() {
     const socket = Client('http://127.0.0.1:5000', {
         reconnection: true,
@@ -20,10 +54,11 @@ function connectPythonSocket() {
         pythonSocket = socket;
     });
 
-    socket.on('frame', (data) => {
-        console.log('收到 Python 端影像數據，大小:', data.frame.length, '字元');
-        // 只傳送 base64 字符串
-        io.emit('frame', data.frame);
+    // JPEG 以二進位附件原樣轉送（含影像序號與檢測資料），分送後立即確認，Python 端才會送下一張
+    socket.on('frame', (data, ack) => {
+        console.log('收到 Python 端影像數據，大小:', data.frame.length, 'bytes');
+        fanOut('frame', data);
+        if (ack) ack();
     });
 
     socket.on('object_counts', (data) => {
@@ -43,6 +78,7 @@ function connectPythonSocket() {
 
 io.on('connection', (socket) => {
     console.log('前端已連線，Socket ID:', socket.id);
+    viewers.set(socket.id, { socket, streams: {} });
 
     socket.on('control', (data) => {
         console.log('收到前端控制指令:', data);
@@ -56,6 +92,10 @@ io.on('connection', (socket) => {
 
     socket.on('disconnect', () => {
         console.log('前端已斷線，Socket ID:', socket.id);
+        viewers.delete(socket.id);
+        if (pythonSocket && pythonSocket.connected) {
+            pythonSocket.emit('client_gone', { client: socket.id });
+        }
     });
 });
 
@@ -0,0 +1,85 @@
+"""推論解析度自動調校
+
+以錄製的影像在多個推論解析度下重播，量測延遲與相對於 640（訓練尺寸）
+結果的檢測一致度（F1），將達到 AUTOTUNE_MIN_AGREEMENT 的最小解析度
+寫入執行期設定檔（RUNTIME_CONFIG_FILE），VisionProcessor 啟動時讀取。
+
+執行方式（於專案根目錄）：
+    python -m tools.autotune_imgsz --source ./recordings
+    python -m tools.autotune_imgsz --source record.mp4 --sizes 256 320 416 --dry-run
+"""
+import time
+import argparse
+import numpy as np
+
+from config import DETECTOR_ENGINE, RUNTIME_CONFIG_FILE, AUTOTUNE_SIZES, AUTOTUNE_MIN_AGREEMENT
+from function.vision_processor import load_mask_roi, crop_roi, scale_input_shape
+from function.detector_engine import create_engine
+from function.detection_metrics import detection_agreement
+from function.runtime_config import update_runtime_config
+from tools.bench_detector import load_frames
+
+BASELINE_SIZE = 640
+
+def measure(engine, images, warmup):
+    """逐張推論，回傳 (每張結果, 平均延遲 ms)"""
+    for image in images[:warmup]:
+        engine.predict(image)
+    results, latency = [], []
+    for image in images:
+        start = time.perf_counter()
+        results.append(engine.predict(image))
+        latency.append((time.perf_counter() - start) * 1000)
+    return results, float(np.mean(latency))
+
+def main():
+    parser = argparse.ArgumentParser(description="推論解析度自動調校")
+    parser.add_argument('--source', required=True, help="影像資料夾或影片檔")
+    parser.add_argument('--frames', type=int, default=None)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--engine', default=DETECTOR_ENGINE)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(AUTOTUNE_SIZES))
+    parser.add_argument('--min-agreement', type=float, default=AUTOTUNE_MIN_AGREEMENT)
+    parser.add_argument('--output', default=RUNTIME_CONFIG_FILE)
+    parser.add_argument('--dry-run', action='store_true', help="只顯示結果，不寫入設定檔")
+    parser.add_argument('--mask', default="mask.png")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        print(f"沒有可用的影像: {args.source}")
+        return
+    _, roi, roi_mask, input_shape = load_mask_roi(args.mask)
+    images = [crop_roi(image, roi, roi_mask)[0] for _, image in frames]
+
+    sizes = sorted(set(args.sizes) | {BASELINE_SIZE})
+    measured = {}
+    for size in sizes:
+        engine = create_engine(scale_input_shape(input_shape, size), args.engine)
+        measured[size] = measure(engine, images, args.warmup)
+
+    baseline, baseline_ms = measured[BASELINE_SIZE]
+    if not any(baseline):
+        print("640 的結果中沒有任何物件，無法比較一致度，請改用有物件的影像")
+        return
+
+    print(f"{'解析度':>6} {'輸入':>9} {'平均(ms)':>9} {'FPS':>7} {'一致度':>8}")
+    chosen = BASELINE_SIZE
+    for size in sizes:
+        results, latency = measured[size]
+        agreement = detection_agreement(results, baseline)
+        h, w = scale_input_shape(input_shape, size)
+        print(f"{size:>6} {f'{h}x{w}':>9} {latency:>9.1f} {1000 / latency:>7.1f} {agreement:>8.3f}")
+        if size < chosen and agreement >= args.min_agreement:
+            chosen = size
+
+    chosen_ms = measured[chosen][1]
+    print(f"選擇 {chosen}（一致度門檻 {args.min_agreement}，延遲 {baseline_ms:.1f} → {chosen_ms:.1f} ms）")
+    if args.dry_run:
+        return
+    update_runtime_config(args.output, imgsz=chosen, imgsz_engine=args.engine,
+                          imgsz_agreement=round(detection_agreement(measured[chosen][0], baseline), 4))
+    print(f"已寫入 {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""推論引擎效能與精度比較
+
+以資料夾中的影像或影片重播，套用與執行時相同的遮罩 ROI 裁切後，
+分別以 ultralytics（PyTorch）與 ONNX Runtime 推論，比較每張影像的延遲，
+並以 PyTorch 的輸出（或 --labels 指定的 YOLO 標註）為基準計算 mAP50。
+
+執行方式（於專案根目錄）：
+    python -m tools.bench_detector --source ./samples
+    python -m tools.bench_detector --source record.mp4 --frames 200 --labels ./samples/labels
+"""
+import os
+import glob
+import time
+import argparse
+import cv2
+import numpy as np
+
+from config import DETECTOR_WEIGHTS
+from function.vision_processor import load_mask_roi, crop_roi
+from function.detector_engine import UltralyticsEngine, OnnxEngine
+from function.detection_metrics import mean_average_precision, detection_agreement
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def load_frames(source, limit=None):
+    """讀取影像資料夾或影片，回傳 [(名稱, 影像), ...]"""
+    frames = []
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, '*')) if p.lower().endswith(IMAGE_EXTS))
+        for path in paths[:limit]:
+            image = cv2.imread(path)
+            if image is not None:
+                frames.append((os.path.splitext(os.path.basename(path))[0], image))
+    else:
+        capture = cv2.VideoCapture(source)
+        while limit is None or len(frames) < limit:
+            ret, image = capture.read()
+            if not ret:
+                break
+            frames.append((f"{len(frames):06d}", image))
+        capture.release()
+    return frames
+
+def load_labels(label_dir, name, shape, names, offset):
+    """讀取 YOLO 格式標註（相對於整張影像），轉為裁切後影像座標的物件列表"""
+    path = os.path.join(label_dir, name + '.txt')
+    if not os.path.exists(path):
+        return []
+    h, w = shape[:2]
+    objects = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            cls, cx, cy, bw, bh = int(parts[0]), *map(float, parts[1:5])
+            x1 = (cx - bw / 2) * w - offset[0]
+            y1 = (cy - bh / 2) * h - offset[1]
+            objects.append({
+                'class': names.get(cls, str(cls)),
+                'bbox': (x1, y1, x1 + bw * w, y1 + bh * h),
+            })
+    return objects
+
+def run(engine, images, warmup):
+    """逐張推論，回傳 (每張結果, 每張延遲 ms)"""
+    for image in images[:warmup]:
+        engine.predict(image)
+    results, latency = [], []
+    for image in images:
+        start = time.perf_counter()
+        results.append(engine.predict(image))
+        latency.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latency)
+
+def report(name, latency, results, references, baseline=None):
+    mAP = mean_average_precision(results, references)
+    agree = detection_agreement(results, baseline) if baseline is not None else 1.0
+    print(f"{name:<12} {np.mean(latency):>9.1f} {np.percentile(latency, 50):>9.1f} {np.percentile(latency, 95):>9.1f} "
+          f"{1000 / np.mean(latency):>7.1f} {mAP:>8.3f} {agree:>8.3f}")
+    return mAP
+
+def main():
+    parser = argparse.ArgumentParser(description="推論引擎效能與精度比較")
+    parser.add_argument('--source', required=True, help="影像資料夾或影片檔")
+    parser.add_argument('--frames', type=int, default=None)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--weights', default=DETECTOR_WEIGHTS)
+    parser.add_argument('--onnx', default=None, help="指定 ONNX 模型，預設由權重匯出")
+    parser.add_argument('--labels', default=None, help="YOLO 格式標註資料夾，未指定時以 PyTorch 輸出為基準")
+    parser.add_argument('--mask', default="mask.png")
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        print(f"沒有可用的影像: {args.source}")
+        return
+    _, roi, roi_mask, input_shape = load_mask_roi(args.mask)
+    crops = [crop_roi(image, roi, roi_mask) for _, image in frames]
+    images = [crop for crop, _ in crops]
+    print(f"影像數: {len(images)}，模型輸入 {input_shape[0]}x{input_shape[1]}")
+
+    torch_engine = UltralyticsEngine(weights=args.weights, imgsz=input_shape)
+    torch_results, torch_latency = run(torch_engine, images, args.warmup)
+    onnx_engine = OnnxEngine(weights=args.weights, imgsz=input_shape, model_path=args.onnx)
+    onnx_results, onnx_latency = run(onnx_engine, images, args.warmup)
+
+    if args.labels:
+        names = {int(k): str(v).lower() for k, v in torch_engine.model.names.items()}
+        references = [load_labels(args.labels, name, image.shape, names, offset)
+                      for (name, image), (_, offset) in zip(frames, crops)]
+        print("基準: 標註資料")
+    else:
+        references = torch_results
+        print("基準: PyTorch 輸出")
+
+    print(f"{'引擎':<12} {'平均(ms)':>9} {'P50(ms)':>9} {'P95(ms)':>9} {'FPS':>7} {'mAP50':>8} {'一致度':>8}")
+    torch_map = report('ultralytics', torch_latency, torch_results, references)
+    onnx_map = report('onnx', onnx_latency, onnx_results, references, baseline=torch_results)
+    print(f"加速 {np.mean(torch_latency) / np.mean(onnx_latency):.2f}x，mAP50 差異 {onnx_map - torch_map:+.3f}")
+
+if __name__ == '__main__':
+    main()
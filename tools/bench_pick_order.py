@@ -0,0 +1,65 @@
+"""夾取順序規劃效能比較
+
+以隨機產生的物件位置，比較原本的做法（依 X 座標排序、每次回待命位置）、
+X 排序但整批只回一次待命位置、以及規劃器排序（整批只回一次）的預估週期時間。
+「回原點節省」只來自回待命位置的策略（PICK_RETURN_HOME_EACH），
+「排序節省」是規劃器與 X 排序在相同回待命策略下的差異。
+
+只有邊走邊夾（PICK_ON_THE_MOVE）會一次執行多個夾取工作，排序節省只適用於該模式；
+停帶夾取每個工作前輸送帶都要前進，每張影像只夾一個物件。
+--index-ms 可加入每個工作的輸送帶前進時間，估計若停帶夾取也整批執行時的差異。
+
+執行方式（於專案根目錄）：
+    python -m tools.bench_pick_order --trials 500 --max-objects 8
+    python -m tools.bench_pick_order --index-ms 4850
+"""
+import argparse
+import random
+import time
+import numpy as np
+
+from config import BIN_POSITIONS, DOBOT_HOME
+from function.dobot_controller import DobotController
+from function.pick_planner import plan_pick_order, route_time
+
+def random_scene(dobot, n, width=640, height=480):
+    """產生 n 個隨機物件，回傳 (像素中心點, 工作) 列表"""
+    scene = []
+    for _ in range(n):
+        center = (random.randint(80, width - 80), random.randint(80, height - 80))
+        color = random.choice(list(BIN_POSITIONS))
+        scene.append((center, (dobot.pixel_to_robot(*center), BIN_POSITIONS[color])))
+    return scene
+
+def main():
+    parser = argparse.ArgumentParser(description="夾取順序規劃效能比較")
+    parser.add_argument('--trials', type=int, default=500)
+    parser.add_argument('--max-objects', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--index-ms', type=float, default=0.0, help="每個工作前輸送帶前進的時間（毫秒）")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    index_time = args.index_ms / 1000.0
+    dobot = DobotController()
+    print(f"{'物件數':>6} {'X排序+每次回原點':>16} {'X排序連續':>10} {'規劃順序':>10} "
+          f"{'回原點節省':>10} {'排序節省':>8} {'規劃耗時(ms)':>12}")
+    for n in range(2, args.max_objects + 1):
+        baseline, xsort, planned, plan_ms = [], [], [], []
+        for _ in range(args.trials):
+            scene = random_scene(dobot, n)
+            jobs = [job for _, job in scene]
+            x_order = sorted(range(n), key=lambda i: scene[i][0][0])
+            start = time.perf_counter()
+            order = plan_pick_order(DOBOT_HOME, jobs, end=DOBOT_HOME)
+            plan_ms.append((time.perf_counter() - start) * 1000)
+            baseline.append(route_time(DOBOT_HOME, jobs, x_order, end=DOBOT_HOME, return_home_each=True, index_time=index_time))
+            xsort.append(route_time(DOBOT_HOME, jobs, x_order, end=DOBOT_HOME, index_time=index_time))
+            planned.append(route_time(DOBOT_HOME, jobs, order, end=DOBOT_HOME, index_time=index_time))
+        homing_saving = (1 - np.mean(xsort) / np.mean(baseline)) * 100
+        order_saving = (1 - np.mean(planned) / np.mean(xsort)) * 100
+        print(f"{n:>6} {np.mean(baseline):>15.2f}s {np.mean(xsort):>9.2f}s {np.mean(planned):>9.2f}s "
+              f"{homing_saving:>9.1f}% {order_saving:>7.1f}% {np.mean(plan_ms):>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""分割階段記憶體配置與效能比較
+
+比較原本的做法（遮罩複本 → 完整 HSV 轉換 → inRange → 開運算，每張影像配置新陣列）
+與 Segmenter（預先配置緩衝區、只計算 V = max(B, G, R)）每張影像的記憶體配置量
+（tracemalloc 量測的暫時配置峰值）與耗時，並確認兩者的遮罩相同。
+OpenCV 內部的暫存（例如開運算的中間結果）不經過 Python 配置，不在量測範圍內。
+
+執行方式（於專案根目錄）：
+    python -m tools.bench_segmentation
+    python -m tools.bench_segmentation --source ./recordings --frames 100
+"""
+import time
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+
+from config import kernel, SEGMENT_V_THRESHOLD
+from function.vision_processor import load_mask_roi, crop_roi
+from function.segmentation import Segmenter
+from tools.bench_detector import load_frames
+
+def legacy_segment(image, roi, roi_mask):
+    """原本的分割流程"""
+    cap_mask, _ = crop_roi(image, roi, roi_mask)
+    hsv = cv2.cvtColor(cap_mask, cv2.COLOR_BGR2HSV)
+    mask_black = cv2.inRange(hsv, np.array([0, 0, SEGMENT_V_THRESHOLD]), np.array([255, 255, 255]))
+    return cv2.morphologyEx(mask_black, cv2.MORPH_OPEN, kernel)
+
+def measure(func, frames):
+    """回傳 (每張平均暫時配置量 bytes, 每張平均耗時 ms, 每張的遮罩複本)"""
+    func(frames[0])  # 第一次呼叫配置緩衝區，不列入計算
+    peaks, masks = [], []
+    tracemalloc.start()
+    for frame in frames:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        mask = func(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        masks.append(mask.copy())
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for frame in frames:
+        func(frame)
+    elapsed = (time.perf_counter() - start) / len(frames) * 1000
+    return float(np.mean(peaks)), elapsed, masks
+
+def main():
+    parser = argparse.ArgumentParser(description="分割階段記憶體配置與效能比較")
+    parser.add_argument('--source', default=None, help="影像資料夾或影片檔，預設使用隨機影像")
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--mask', default="mask.png")
+    args = parser.parse_args()
+
+    img_mask, roi, roi_mask, _ = load_mask_roi(args.mask)
+    if args.source:
+        frames = [image for _, image in load_frames(args.source, args.frames)]
+    else:
+        h, w = img_mask.shape[:2] if img_mask is not None else (480, 640)
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for _ in range(args.frames)]
+    if not frames:
+        print("沒有可用的影像")
+        return
+
+    segmenter = Segmenter(roi, roi_mask)
+    buffered = lambda frame: segmenter.segment(segmenter.crop(frame)[0])
+    legacy_bytes, legacy_ms, legacy_masks = measure(lambda frame: legacy_segment(frame, roi, roi_mask), frames)
+    new_bytes, new_ms, new_masks = measure(buffered, frames)
+    same = all(np.array_equal(a, b) for a, b in zip(legacy_masks, new_masks))
+
+    print(f"影像數: {len(frames)}，遮罩結果{'相同' if same else '不同'}")
+    print(f"{'做法':<10} {'配置/張(KB)':>12} {'耗時/張(ms)':>12}")
+    print(f"{'原本':<10} {legacy_bytes / 1024:>12.1f} {legacy_ms:>12.3f}")
+    print(f"{'Segmenter':<10} {new_bytes / 1024:>12.1f} {new_ms:>12.3f}")
+
+if __name__ == '__main__':
+    main()
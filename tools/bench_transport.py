@@ -0,0 +1,80 @@
+"""影像傳輸方式比較：base64 字串與 Socket.IO 二進位附件
+
+以錄製的影像（資料夾或影片）重播，比較每張影像在兩種傳輸方式下
+Python 端的封包大小與 CPU 時間。封包由 python-socketio 的 Packet.encode()
+（與 emit 相同的編碼與二進位附件處理）產生，再以 engineio 的 Packet 包成
+WebSocket 上實際送出的訊息：base64 為一個文字訊息；二進位為一個含 placeholder
+的文字標頭加上原始 JPEG 的二進位訊息。
+server.js 轉送時送出的封包與收到的相同，頻寬差異在轉送端與瀏覽器端再出現一次。
+不含網路與 WebSocket 框架本身的成本。
+
+執行方式（於專案根目錄）：
+    python -m tools.bench_transport --source ./recordings
+    python -m tools.bench_transport --source record.mp4 --fps 30
+"""
+import time
+import base64
+import argparse
+import cv2
+import numpy as np
+from socketio import packet as sio_packet
+from engineio import packet as eio_packet
+
+from tools.bench_detector import load_frames
+
+def websocket_messages(data):
+    """依 python-socketio 的 emit 流程編碼事件，回傳 WebSocket 上送出的各則訊息"""
+    encoded = sio_packet.Packet(sio_packet.EVENT, data=data).encode()
+    if not isinstance(encoded, list):
+        encoded = [encoded]
+    return [eio_packet.Packet(eio_packet.MESSAGE, data=part).encode() for part in encoded]
+
+def base64_packet(jpg, seq):
+    """原本的做法：JPEG → base64 字串 → JSON 文字封包"""
+    text = base64.b64encode(jpg).decode('utf-8')
+    return websocket_messages(['frame', {'frame': text, 'seq': seq}])
+
+def binary_packet(jpg, seq):
+    """二進位附件：JSON 標頭以 placeholder 代替影像，影像原樣附加"""
+    return websocket_messages(['frame', {'frame': jpg.tobytes(), 'seq': seq}])
+
+def packet_size(packet):
+    return sum(len(part.encode('utf-8')) if isinstance(part, str) else len(part) for part in packet)
+
+def measure(builder, jpgs, repeat):
+    """回傳 (平均封包大小 bytes, 平均 CPU 時間 ms)"""
+    sizes = [packet_size(builder(jpg, seq)) for seq, jpg in enumerate(jpgs)]
+    start = time.process_time()
+    for _ in range(repeat):
+        for seq, jpg in enumerate(jpgs):
+            builder(jpg, seq)
+    cpu = (time.process_time() - start) / (repeat * len(jpgs)) * 1000
+    return float(np.mean(sizes)), cpu
+
+def main():
+    parser = argparse.ArgumentParser(description="影像傳輸方式比較")
+    parser.add_argument('--source', required=True, help="影像資料夾或影片檔")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--quality', type=int, default=95, help="JPEG 品質（cv2 預設 95）")
+    parser.add_argument('--fps', type=float, default=30.0, help="換算頻寬用的影格率")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    if not frames:
+        print(f"沒有可用的影像: {args.source}")
+        return
+    jpgs = [cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, args.quality])[1] for _, image in frames]
+    print(f"影像數: {len(jpgs)}，平均 JPEG {np.mean([len(j) for j in jpgs]) / 1024:.1f} KB")
+
+    rows = [('base64', *measure(base64_packet, jpgs, args.repeat)),
+            ('binary', *measure(binary_packet, jpgs, args.repeat))]
+    print(f"{'方式':<8} {'封包(KB)':>9} {'頻寬(Mbit/s)':>13} {'CPU(ms/張)':>11}")
+    for name, size, cpu in rows:
+        print(f"{name:<8} {size / 1024:>9.1f} {size * 8 * args.fps / 1e6:>13.2f} {cpu:>11.3f}")
+    (_, b64_size, b64_cpu), (_, bin_size, bin_cpu) = rows
+    print(f"二進位封包小 {1 - bin_size / b64_size:.1%}（Python → server.js、server.js → 瀏覽器 兩段都是），"
+          f"Python 端 CPU 時間少 {1 - bin_cpu / max(b64_cpu, 1e-9):.1%}")
+
+if __name__ == '__main__':
+    main()
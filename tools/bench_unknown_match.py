@@ -0,0 +1,70 @@
+"""未知物件比對效能比較
+
+以隨機產生的輪廓外框與檢測框，比較原本逐一比對的 Python 雙迴圈、
+一次計算包含矩陣的向量化版本，以及 unknown_indices 預設（組合數不超過
+UNKNOWN_LOOP_MAX_PAIRS 時逐一比對）的耗時，並確認結果相同。
+
+執行方式（於專案根目錄）：
+    python -m tools.bench_unknown_match --repeat 200
+"""
+import argparse
+import random
+import time
+
+from config import UNKNOWN_MARGIN, UNKNOWN_LOOP_MAX_PAIRS
+from function.detection_metrics import unknown_indices
+
+CASES = [(5, 3), (20, 5), (50, 10), (100, 10), (300, 20), (1000, 50)]
+
+def random_boxes(n, width=640, height=480, min_size=10, max_size=80):
+    boxes = []
+    for _ in range(n):
+        w, h = random.randint(min_size, max_size), random.randint(min_size, max_size)
+        x, y = random.randint(0, width - w), random.randint(0, height - h)
+        boxes.append((x, y, x + w, y + h))
+    return boxes
+
+def loop_unknown(blobs, detections, margin):
+    """原本的做法：每個輪廓逐一檢查每個檢測框"""
+    unknown = []
+    for i, (x1, y1, x2, y2) in enumerate(blobs):
+        is_known = False
+        for bbox in detections:
+            if (x1 >= bbox[0] - margin and x2 <= bbox[2] + margin and
+                    y1 >= bbox[1] - margin and y2 <= bbox[3] + margin):
+                is_known = True
+                break
+        if not is_known:
+            unknown.append(i)
+    return unknown
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1e6, result
+
+def main():
+    parser = argparse.ArgumentParser(description="未知物件比對效能比較")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"{'輪廓數':>6} {'檢測框':>6} {'迴圈(us)':>10} {'向量化(us)':>11} {'預設(us)':>10} {'結果':>5}")
+    for n_blobs, n_dets in CASES:
+        # 一半的輪廓放在檢測框內，模擬已知物件
+        detections = random_boxes(n_dets, min_size=60, max_size=120)
+        blobs = random_boxes(n_blobs // 2)
+        for _ in range(n_blobs - len(blobs)):
+            x1, y1, x2, y2 = random.choice(detections)
+            dx, dy = random.randint(-15, 15), random.randint(-15, 15)
+            blobs.append((x1 + dx, y1 + dy, x2 + dx, y2 + dy))
+        loop_us, expected = timeit(lambda: loop_unknown(blobs, detections, UNKNOWN_MARGIN), args.repeat)
+        vec_us, vec_result = timeit(lambda: unknown_indices(blobs, detections, UNKNOWN_MARGIN, loop_max_pairs=0), args.repeat)
+        auto_us, result = timeit(lambda: unknown_indices(blobs, detections, UNKNOWN_MARGIN, loop_max_pairs=UNKNOWN_LOOP_MAX_PAIRS), args.repeat)
+        same = 'OK' if result == expected and vec_result == expected else '不符'
+        print(f"{n_blobs:>6} {n_dets:>6} {loop_us:>10.1f} {vec_us:>11.1f} {auto_us:>10.1f} {same:>5}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""像素→手臂座標標定
+
+讀取記錄的點對 CSV（欄位：px,py,rx,ry），擬合單應性矩陣並存成標定檔。
+點對的記錄方式需與實際夾取流程一致：px,py 為檢測時物件中心的像素座標，
+rx,ry 為輸送帶前進 CONVEYOR_INDEX_MS 後手臂實際夾到該物件的座標。
+
+執行方式（於專案根目錄）：
+    python -m tools.calibrate points.csv
+    python -m tools.calibrate points.csv --output calibration.json
+"""
+import argparse
+import csv
+import numpy as np
+
+from config import CALIBRATION_FILE
+from function.calibration import HomographyCalibration, LegacyCalibration
+
+def read_points(path):
+    """讀取點對 CSV，回傳 (像素座標, 手臂座標)"""
+    pixels, robots = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            pixels.append((float(row['px']), float(row['py'])))
+            robots.append((float(row['rx']), float(row['ry'])))
+    return np.array(pixels), np.array(robots)
+
+def rms_error(model, pixels, robots):
+    return float(np.sqrt(np.mean(np.sum((model.pixels_to_robot(pixels) - robots) ** 2, axis=1))))
+
+def main():
+    parser = argparse.ArgumentParser(description="像素→手臂座標標定")
+    parser.add_argument('points', help="點對 CSV 檔（px,py,rx,ry）")
+    parser.add_argument('--output', default=CALIBRATION_FILE, help="標定檔輸出路徑")
+    args = parser.parse_args()
+
+    pixels, robots = read_points(args.points)
+    print(f"讀取 {len(pixels)} 組點對")
+    model = HomographyCalibration.fit(pixels, robots)
+    legacy = LegacyCalibration()
+    errors = np.linalg.norm(model.pixels_to_robot(pixels) - robots, axis=1)
+    print(f"單應性矩陣 RMS 誤差: {model.rms:.2f} mm（最大 {errors.max():.2f} mm）")
+    print(f"原本分段線性 RMS 誤差: {rms_error(legacy, pixels, robots):.2f} mm")
+    model.save(args.output)
+    print(f"已儲存標定檔: {args.output}")
+
+if __name__ == '__main__':
+    main()
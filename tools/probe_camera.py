@@ -0,0 +1,87 @@
+"""攝影機擷取模式量測
+
+依序以不同 FOURCC / 解析度 / FPS 開啟攝影機，量測開啟時間、實際輸出 FPS、
+影格間隔抖動與 read() 等待時間，協助挑選 config.CAMERA_PROFILE。
+read() 等待時間為呼叫到取得影像的時間，不含感光元件到驅動的延遲。
+
+執行方式（於專案根目錄）：
+    python -m tools.probe_camera
+    python -m tools.probe_camera --source 0 --seconds 5 --backend dshow
+"""
+import argparse
+import time
+import numpy as np
+
+from config import Video_num, CAMERA_PROFILE
+from function.camera_grabber import open_capture, describe_capture
+
+FOURCCS = ['MJPG', 'YUYV']
+RESOLUTIONS = [(640, 480), (800, 600), (1280, 720), (1920, 1080)]
+FPS_LIST = [30, 60]
+
+def probe(source, backend, fourcc, width, height, fps, seconds, warmup=10):
+    """量測單一模式，回傳結果 dict；無法開啟或設定不符時回傳 None"""
+    profile = dict(CAMERA_PROFILE, backend=backend, fourcc=fourcc, width=width, height=height, fps=fps)
+    start = time.time()
+    capture = open_capture(source, profile)
+    open_time = time.time() - start
+    if not capture.isOpened():
+        return None
+    try:
+        actual = describe_capture(capture)
+        if actual['width'] != width or actual['height'] != height:
+            return None
+        for _ in range(warmup):
+            capture.read()
+        stamps, waits = [], []
+        end = time.time() + seconds
+        while time.time() < end:
+            t0 = time.perf_counter()
+            ret, _ = capture.read()
+            t1 = time.perf_counter()
+            if not ret:
+                break
+            waits.append(t1 - t0)
+            stamps.append(t1)
+        if len(stamps) < 2:
+            return None
+        intervals = np.diff(stamps) * 1000
+        return {
+            'mode': f"{actual['fourcc']} {width}x{height}@{fps}",
+            'open_s': open_time,
+            'fps': (len(stamps) - 1) / (stamps[-1] - stamps[0]),
+            'interval_ms': float(np.mean(intervals)),
+            'jitter_ms': float(np.std(intervals)),
+            'read_ms': float(np.mean(waits) * 1000),
+        }
+    finally:
+        capture.release()
+
+def main():
+    parser = argparse.ArgumentParser(description="攝影機擷取模式量測")
+    parser.add_argument('--source', type=int, default=Video_num)
+    parser.add_argument('--backend', default=CAMERA_PROFILE.get('backend', 'auto'))
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    results = []
+    for fourcc in FOURCCS:
+        for width, height in RESOLUTIONS:
+            for fps in FPS_LIST:
+                result = probe(args.source, args.backend, fourcc, width, height, fps, args.seconds)
+                if result is not None:
+                    results.append(result)
+
+    if not results:
+        print("沒有可用的擷取模式")
+        return
+    print(f"{'模式':<22} {'開啟(s)':>8} {'FPS':>7} {'間隔(ms)':>9} {'抖動(ms)':>9} {'read(ms)':>9}")
+    for r in results:
+        print(f"{r['mode']:<22} {r['open_s']:>8.2f} {r['fps']:>7.1f} {r['interval_ms']:>9.1f} {r['jitter_ms']:>9.1f} {r['read_ms']:>9.1f}")
+    # 抖動不超過間隔 20% 的模式中挑 FPS 最高者
+    stable = [r for r in results if r['jitter_ms'] <= 0.2 * r['interval_ms']] or results
+    best = max(stable, key=lambda r: r['fps'])
+    print(f"建議模式: {best['mode']}（{best['fps']:.1f} FPS）")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""檢測模型 INT8 靜態量化
+
+以錄製的影像校正 FP32 ONNX 模型的量化參數，產生 INT8（QDQ）模型，
+再以標註資料評估 mAP50。只有在 mAP50 不低於訓練紀錄（results.csv 中
+best.pt 對應的 epoch）減去 QUANT_MAX_MAP_DROP 時才發佈到
+ONNX_INT8 會讀取的路徑，否則刪除候選模型並以非零狀態結束。
+
+評估預設使用與 ultralytics 驗證相同的低信心門檻（0.001），
+才能與 results.csv 的 mAP50 比較。
+
+執行方式（於專案根目錄）：
+    python -m tools.quantize_detector --calib ./recordings --val ./val/images --labels ./val/labels
+"""
+import os
+import re
+import csv
+import sys
+import time
+import argparse
+import numpy as np
+
+from config import DETECTOR_WEIGHTS, QUANT_MAX_MAP_DROP
+from function.vision_processor import load_mask_roi, crop_roi
+from function.detector_engine import OnnxEngine, export_onnx, int8_path
+from function.detection_metrics import mean_average_precision
+from tools.bench_detector import load_frames, load_labels
+
+CALIBRATE_METHODS = ['minmax', 'entropy', 'percentile']
+
+def baseline_map50(results_csv):
+    """讀取訓練紀錄，回傳 best.pt 對應 epoch 的 (epoch, mAP50)
+
+    ultralytics 以 0.1 * mAP50 + 0.9 * mAP50-95 挑選 best.pt。
+    """
+    with open(results_csv, 'r', encoding='utf-8') as f:
+        rows = [{k.strip(): v for k, v in row.items()} for row in csv.DictReader(f)]
+    best = max(rows, key=lambda r: 0.1 * float(r['metrics/mAP50(B)']) + 0.9 * float(r['metrics/mAP50-95(B)']))
+    return int(best['epoch']), float(best['metrics/mAP50(B)'])
+
+def head_nodes(model):
+    """偵測頭最後一層中 Conv 以外的節點（DFL、框解碼、類別 Sigmoid），量化後誤差大，保留 FP32"""
+    pattern = re.compile(r'^/model\.(\d+)/')
+    indices = [int(m.group(1)) for m in (pattern.match(node.name) for node in model.graph.node) if m]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [node.name for node in model.graph.node if node.name.startswith(prefix) and node.op_type != 'Conv']
+
+class FrameReader:
+    """提供校正影像給 ONNX Runtime 量化器（CalibrationDataReader 介面）"""
+
+    def __init__(self, engine, images):
+        self.engine = engine
+        self.images = images
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.images):
+            return None
+        self.engine._letterbox(self.images[self.index])
+        self.index += 1
+        return {self.engine.input_name: self.engine._blob.copy()}
+
+    def rewind(self):
+        self.index = 0
+
+def quantize(fp32_path, output_path, engine, images, method, exclude_head=True):
+    """靜態量化 FP32 模型並保留模型的 metadata（類別名稱）"""
+    import onnx
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType, CalibrationMethod
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared = os.path.splitext(output_path)[0] + '-prep.onnx'
+    try:
+        quant_pre_process(fp32_path, prepared)
+    except Exception as e:
+        print(f"前處理失敗，直接量化原始模型: {e}")
+        prepared = fp32_path
+
+    model = onnx.load(prepared)
+    excluded = head_nodes(model) if exclude_head else []
+    print(f"保留 FP32 的節點數: {len(excluded)}")
+    methods = {'minmax': CalibrationMethod.MinMax, 'entropy': CalibrationMethod.Entropy,
+               'percentile': CalibrationMethod.Percentile}
+    try:
+        quantize_static(prepared, output_path, FrameReader(engine, images),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        calibrate_method=methods[method], nodes_to_exclude=excluded)
+    finally:
+        if prepared != fp32_path and os.path.exists(prepared):
+            os.remove(prepared)
+
+    quantized = onnx.load(output_path)
+    source = onnx.load(fp32_path, load_external_data=False)
+    existing = {prop.key for prop in quantized.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(quantized, output_path)
+
+def evaluate(engine, images, references):
+    """回傳 (mAP50, 平均延遲 ms)"""
+    results, latency = [], []
+    for image in images:
+        start = time.perf_counter()
+        results.append(engine.predict(image))
+        latency.append((time.perf_counter() - start) * 1000)
+    return mean_average_precision(results, references), float(np.mean(latency))
+
+def main():
+    parser = argparse.ArgumentParser(description="檢測模型 INT8 靜態量化")
+    parser.add_argument('--calib', required=True, help="校正用影像資料夾或影片")
+    parser.add_argument('--val', required=True, help="評估用影像資料夾")
+    parser.add_argument('--labels', required=True, help="評估影像的 YOLO 格式標註資料夾")
+    parser.add_argument('--frames', type=int, default=200, help="校正影像數上限")
+    parser.add_argument('--weights', default=DETECTOR_WEIGHTS)
+    parser.add_argument('--onnx', default=None, help="指定 FP32 ONNX 模型，預設由權重匯出")
+    parser.add_argument('--results', default=None, help="訓練紀錄 results.csv，預設為權重資料夾上一層")
+    parser.add_argument('--max-drop', type=float, default=QUANT_MAX_MAP_DROP)
+    parser.add_argument('--method', choices=CALIBRATE_METHODS, default='minmax')
+    parser.add_argument('--conf', type=float, default=0.001, help="評估用信心門檻")
+    parser.add_argument('--keep-head', action='store_true', help="偵測頭也量化")
+    parser.add_argument('--mask', default="mask.png")
+    args = parser.parse_args()
+
+    results_csv = args.results or os.path.join(os.path.dirname(os.path.dirname(args.weights)), 'results.csv')
+    epoch, baseline = baseline_map50(results_csv)
+    threshold = baseline - args.max_drop
+    print(f"訓練紀錄 mAP50: {baseline:.4f}（epoch {epoch}），發佈門檻 {threshold:.4f}")
+
+    _, roi, roi_mask, input_shape = load_mask_roi(args.mask)
+    calib = [crop_roi(image, roi, roi_mask)[0] for _, image in load_frames(args.calib, args.frames)]
+    val_frames = load_frames(args.val)
+    if not calib or not val_frames:
+        print("校正或評估影像為空")
+        sys.exit(1)
+    val_crops = [crop_roi(image, roi, roi_mask) for _, image in val_frames]
+    val_images = [crop for crop, _ in val_crops]
+
+    fp32_path = args.onnx or export_onnx(args.weights, input_shape)
+    fp32 = OnnxEngine(imgsz=input_shape, conf=args.conf, model_path=fp32_path)
+    references = [load_labels(args.labels, name, image.shape, fp32.names, offset)
+                  for (name, image), (_, offset) in zip(val_frames, val_crops)]
+
+    target = int8_path(fp32_path)
+    candidate = os.path.splitext(target)[0] + '-candidate.onnx'
+    print(f"以 {len(calib)} 張影像校正（{args.method}）")
+    quantize(fp32_path, candidate, fp32, calib, args.method, exclude_head=not args.keep_head)
+
+    int8 = OnnxEngine(imgsz=input_shape, conf=args.conf, model_path=candidate)
+    fp32_map, fp32_ms = evaluate(fp32, val_images, references)
+    int8_map, int8_ms = evaluate(int8, val_images, references)
+    print(f"{'模型':<6} {'mAP50':>8} {'平均(ms)':>9}")
+    print(f"{'FP32':<6} {fp32_map:>8.4f} {fp32_ms:>9.1f}")
+    print(f"{'INT8':<6} {int8_map:>8.4f} {int8_ms:>9.1f}")
+
+    if int8_map < threshold:
+        os.remove(candidate)
+        print(f"INT8 mAP50 {int8_map:.4f} 低於門檻 {threshold:.4f}，不發佈")
+        sys.exit(1)
+    os.replace(candidate, target)
+    print(f"已發佈 INT8 模型: {target}（加速 {fp32_ms / int8_ms:.2f}x），將 config.ONNX_INT8 設為 True 即可使用")
+
+if __name__ == '__main__':
+    main()